@@ -25,7 +25,9 @@ the Python llm library made by Simon Willison
 
 Responses are processed by a markdown-rendering
 function that converts them to the scrollview's own
-tags provided by tkinter.
+tags provided by tkinter.  While a reply is being
+generated it streams into the chat as plain text and
+is re-rendered with markup once it is complete.
 
 After the response is received, the script will
 scroll the chat to 4 lines above the user's
@@ -103,18 +105,35 @@ import llm
 import threading
 import queue
 import re
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Iterator
 #import markdown2
 from tkinter import Tk, font
 import webbrowser
 import atexit
+import bisect
 import openai
+# openai 3.x is built on httpx2 (same API as httpx); the pool must come from the package it uses
+if int(openai.__version__.split(".")[0]) >= 3:
+    import httpx2 as httpx
+else:
+    import httpx
 import os   # add missing import
+import collections
 import datetime
+import email.utils
+import hashlib
+import json
+import random
+import sqlite3
+import time
+import weakref
 import sys
 import traceback
+import uuid
+from tkinter import filedialog
 from tkinter import messagebox
-from tkinter import Toplevel  # prepared for potential use
+from tkinter import simpledialog
+from tkinter import Toplevel
 
 
 # ======================================================================
@@ -126,6 +145,76 @@ GROK_MODEL_REASONING = "grok-4-1-fast-reasoning"
 # "grok-4"                         # full reasoning model
 # "grok-beta"                      # previous generation
 
+# HTTP connection pool for the xAI API (see XAIClientManager)
+XAI_BASE_URL = os.getenv("XAI_BASE_URL", "https://api.x.ai/v1")
+HTTP_POOL_SIZE = 4               # keep-alive connections held open to the API
+HTTP_KEEPALIVE_EXPIRY = 120.0    # seconds an idle pooled connection is kept
+HTTP_REWARM_AFTER_IDLE = 45.0    # re-open a connection when typing resumes after this long
+
+# Request scheduling across all windows (see RequestScheduler)
+MAX_CONCURRENT_REQUESTS = 3      # completions in flight at once; keep <= HTTP_POOL_SIZE
+PRIORITY_INTERACTIVE = 0         # user sends — always run first
+PRIORITY_BACKGROUND = 1          # housekeeping work that can wait
+
+# Retries for rate limits and transient server errors (see call_with_retries)
+RETRY_MAX_ATTEMPTS = 6           # total tries per request, including the first
+RETRY_BASE_DELAY = 0.5           # seconds; backoff cap doubles each attempt
+RETRY_MAX_DELAY = 20.0           # never sleep longer than this between tries
+REQUEST_DEADLINE = 90.0          # give up when the next retry would land past this
+
+# Per-model circuit breaker (see CircuitBreaker)
+BREAKER_WINDOW = 10              # recent calls remembered per model
+BREAKER_MIN_CALLS = 4            # don't judge a model on fewer calls than this
+BREAKER_FAILURE_RATE = 0.5       # open when this share of recent calls failed or was slow
+BREAKER_SLOW_CALL = 45.0         # seconds to first token that count as a failure
+BREAKER_COOLDOWN = 30.0          # seconds open before one trial request is let through
+MODEL_FALLBACKS = {GROK_MODEL_REASONING: GROK_MODEL}  # used while a model's breaker is open
+
+# History sent per request (see ContextBudgeter); tokens, including the system prompt
+CONTEXT_BUDGETS = {GROK_MODEL: 32000, GROK_MODEL_REASONING: 32000}
+CONTEXT_BUDGET_DEFAULT = 32000
+CONTEXT_TRIM_TO = 0.75           # when over budget, trim to this share so the prefix holds for a while
+CHARS_PER_TOKEN = 4.0            # first guess; corrected per model from response usage
+
+# Background compaction of old turns (see ContextBudgeter.compaction_block)
+SUMMARY_TRIGGER_TOKENS = 12000   # compact once the unsummarized history passes this
+SUMMARY_BLOCK_TOKENS = 6000      # how much of the oldest history each pass folds in
+SUMMARY_KEEP_RECENT = 6          # the newest messages are never summarized
+SUMMARY_MAX_TOKENS = 700
+
+# Extra completion tokens allowed when Cogitate asks for a [reasoning] section
+COGITATE_EXTRA_TOKENS = 2048
+
+# Hedged requests (see HedgedRequest): when the reasoning model hasn't started
+# answering after HEDGE_AFTER seconds, ask the fast model too and keep whichever finishes first
+HEDGE_ENABLED = False            # default for View > Hedge Slow Replies (a fired hedge is a second paid request)
+HEDGE_AFTER = 6.0                # seconds without a first token before the backup is sent
+HEDGE_MODES = {"QA"}
+HEDGE_MODELS = {GROK_MODEL_REASONING: GROK_MODEL}  # primary -> backup
+HEDGE_MAX_BACKUPS = 1            # backups in flight at once; MAX_CONCURRENT_REQUESTS + this <= HTTP_POOL_SIZE
+
+# Local files (response cache, ...)
+APP_DATA_DIR = os.path.expanduser(os.getenv("GROK_CHATROOM_DIR", "~/.grok_chatroom"))
+
+# Response cache (see ResponseCache) — opt-in: View > Use Response Cache, or GROK_RESPONSE_CACHE=1
+RESPONSE_CACHE_ENABLED = os.getenv("GROK_RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_MEMORY_ITEMS = 64       # most recently used replies kept in memory
+RESPONSE_CACHE_MAX_ROWS = 2000         # replies kept on disk
+RESPONSE_CACHE_TTL = 7 * 24 * 3600.0   # seconds before a cached reply is considered stale
+
+# Session history database (see SessionStore)
+SESSION_STORE_ENABLED = os.getenv("GROK_SESSION_STORE", "1") == "1"
+SESSION_STORE_BATCH = 200        # most writes committed in one transaction
+SEARCH_RANK_WINDOW = 2000        # a search ranks (bm25) only the newest this many matches
+
+# Crash journal (see SessionJournal): windows lost in a crash are offered for restore at startup
+JOURNAL_ENABLED = os.getenv("GROK_JOURNAL", "1") == "1"
+JOURNAL_FSYNC_INTERVAL = 0.5     # seconds between fsyncs; at most this much typing is lost
+RESTORE_RENDER_EXCHANGES = 6     # exchanges rendered right away; older ones load on scroll-up
+
+# Find bar (see FindIndex): shorter queries match all over a long chat, so they wait for Enter
+FIND_MIN_CHARS = 2
+
 # ---------------------------------------------------------------------
 # SETTINGS AND STYLE CONSTANTS (centralize fonts/colors)
 # ---------------------------------------------------------------------
@@ -196,6 +285,12 @@ WINDOW_BG_COLOR= GRAY_COLOR_2
 INITIAL_WINDOW_WIDTH = 700
 INITIAL_WINDOW_HEIGHT = 950
 
+# Scrollback: only the most recent exchanges stay rendered in the chat.
+# Older ones collapse into a one-line placeholder and are re-rendered from
+# the conversation, a page at a time, when scrolled back to.
+SCROLLBACK_KEEP_EXCHANGES = 40
+SCROLLBACK_PAGE = 10
+
 # ======================================================================
 
 
@@ -204,11 +299,219 @@ _GROK_CONVERSATION = None
 
 
 
+_SSE_DONE_RE = re.compile(rb'\ndata: ?\[DONE\]')
+
+
+class _SSEBody(httpx.SyncByteStream):
+    """Response body that is read to its end when closed after the SSE "[DONE]" event.
+
+    openai's Stream stops reading at "[DONE]" and closes the response, which
+    leaves the chunked terminator unread and makes the pool drop the
+    connection.  Only what follows "[DONE]" is drained, so closing a stream
+    cancelled mid-reply still returns at once.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._tail = b"\n"  # so a "data: [DONE]" at the very start is found too
+        self.done = False      # "[DONE]" has arrived
+        self.drained = False   # the body has been read to its end
+
+    def __iter__(self):
+        for chunk in self._stream:
+            if not self.done:
+                seen = self._tail + chunk
+                self.done = _SSE_DONE_RE.search(seen) is not None
+                self._tail = seen[-16:]
+            yield chunk
+        self.drained = True
+
+    def close(self) -> None:
+        if self.done and not self.drained:
+            try:
+                for _ in self._stream:
+                    pass
+            except Exception as e:
+                print(f"[DEBUG] Draining a finished stream failed: {e}", file=sys.stderr)
+        self._stream.close()
+
+
+class _DrainingTransport(httpx.HTTPTransport):
+    """HTTPTransport whose responses finish reading a completed SSE stream before release."""
+
+    def handle_request(self, request):
+        response = super().handle_request(request)
+        response.stream = _SSEBody(response.stream)
+        return response
+
+
+class XAIClientManager:
+    """Owns the OpenAI-compatible client shared by every window and its connection pool.
+
+    warm_up() opens a TLS connection in the background so the first question
+    doesn't pay DNS+TCP+TLS setup; warm_if_idle() does the same after an idle
+    gap.  `stats` counts how many responses came over a reused connection.
+    """
+
+    def __init__(self, base_url: str = XAI_BASE_URL, api_key: str | None = None,
+                 pool_size: int = HTTP_POOL_SIZE, keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+                 verify=True):
+        self.base_url = base_url.rstrip("/")
+        self.stats = {"responses": 0, "new_connections": 0, "reused_connections": 0, "warmups": 0}
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()  # network streams already seen
+        self._last_activity = 0.0
+        self._warming = False
+        self.http_client = openai.DefaultHttpxClient(
+            transport=_DrainingTransport(
+                limits=httpx.Limits(
+                    max_connections=pool_size * 2,
+                    max_keepalive_connections=pool_size,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+                verify=verify,
+            ),
+            event_hooks={"response": [self._on_response]},
+        )
+        # Retries are done by call_with_retries, which knows about deadlines and the UI
+        self.client = openai.OpenAI(base_url=self.base_url, api_key=api_key,
+                                    http_client=self.http_client, max_retries=0)
+
+    def _on_response(self, response: httpx.Response) -> None:
+        """httpx hook: note activity and whether the response reused a pooled connection."""
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self._last_activity = time.monotonic()
+            self.stats["responses"] += 1
+            if stream is None:
+                return
+            if stream in self._connections:
+                self.stats["reused_connections"] += 1
+            else:
+                self._connections.add(stream)
+                self.stats["new_connections"] += 1
+
+    def warm_up(self) -> None:
+        """Open (or refresh) a pooled connection in the background."""
+        with self._lock:
+            if self._warming:
+                return
+            self._warming = True
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    def warm_if_idle(self) -> None:
+        """Warm up if nothing has gone over the pool for HTTP_REWARM_AFTER_IDLE seconds."""
+        if time.monotonic() - self._last_activity > HTTP_REWARM_AFTER_IDLE:
+            self.warm_up()
+
+    def _warm_up(self) -> None:
+        try:
+            # Any response will do; the point is the pooled TLS connection it leaves behind
+            self.http_client.get(
+                f"{self.base_url}/models",
+                headers={"Authorization": f"Bearer {self.client.api_key}"},
+                timeout=10.0,
+            )
+            with self._lock:
+                self.stats["warmups"] += 1
+        except Exception as e:
+            print(f"[DEBUG] Connection warm-up failed: {e}", file=sys.stderr)
+        finally:
+            with self._lock:
+                self._warming = False
+
+    def report(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        return (f"{s['responses']} responses, {s['reused_connections']} on reused connections, "
+                f"{s['new_connections']} new connections, {s['warmups']} warm-ups")
+
+
 # Put your xAI key in llm keys as "grok" or set XAI_API_KEY env var
-client = openai.OpenAI(
-    base_url="https://api.x.ai/v1",
-    api_key=llm.get_key("grok") or os.getenv("XAI_API_KEY")
-)
+client_manager = XAIClientManager(api_key=llm.get_key("grok") or os.getenv("XAI_API_KEY"))
+client = client_manager.client
+atexit.register(lambda: print(f"[DEBUG] HTTP pool: {client_manager.report()}", file=sys.stderr))
+
+
+class RequestScheduler:
+    """Fixed pool of worker threads shared by every window.
+
+    Jobs wait in one queue per priority; within a priority, sessions take
+    turns (round-robin) so a burst from one window can't starve the others.
+    A job whose RequestHandle was cancelled while it waited is skipped.
+    """
+
+    def __init__(self, max_workers: int = MAX_CONCURRENT_REQUESTS):
+        self.max_workers = max_workers
+        self.stats = {"submitted": 0, "started": 0, "skipped": 0, "max_wait": 0.0}
+        self._cond = threading.Condition()
+        # priority -> {session: [jobs]}; dict order is the round-robin order
+        self._pending: Dict[int, Dict[object, list]] = {}
+        self._running = 0
+        self._threads = []
+
+    def submit(self, session, fn, handle=None, priority: int = PRIORITY_INTERACTIVE) -> int:
+        """Queue fn() for `session`; returns how many jobs are ahead of it."""
+        with self._cond:
+            queued = sum(len(jobs) for p, by_session in self._pending.items() if p <= priority
+                         for jobs in by_session.values())
+            sessions = self._pending.setdefault(priority, {})
+            sessions.setdefault(session, []).append((fn, handle, time.monotonic()))
+            self.stats["submitted"] += 1
+            if len(self._threads) < self.max_workers:
+                t = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+            busy = self._running + queued
+        return max(0, busy - self.max_workers + 1)
+
+    def _next_job(self):
+        """Pop the next job (lock held): lowest priority number, then the next session in turn."""
+        for priority in sorted(self._pending):
+            sessions = self._pending[priority]
+            while sessions:
+                session = next(iter(sessions))
+                jobs = sessions.pop(session)
+                job = jobs.pop(0)
+                if jobs:
+                    sessions[session] = jobs  # back of the line for this session
+                fn, handle, queued_at = job
+                if handle is not None and handle.cancelled.is_set():
+                    self.stats["skipped"] += 1
+                    continue
+                wait = time.monotonic() - queued_at
+                self.stats["max_wait"] = max(self.stats["max_wait"], wait)
+                return fn
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                fn = self._next_job()
+                while fn is None:
+                    self._cond.wait()
+                    fn = self._next_job()
+                self._running += 1
+                self.stats["started"] += 1
+            try:
+                fn()
+            except Exception as e:
+                print(f"[DEBUG] Scheduled job failed: {e}", file=sys.stderr)
+                traceback.print_exc()
+            finally:
+                with self._cond:
+                    self._running -= 1
+
+    def report(self) -> str:
+        with self._cond:
+            s = dict(self.stats)
+        return (f"{s['submitted']} submitted, {s['started']} run, {s['skipped']} skipped after cancel, "
+                f"longest queue wait {s['max_wait']:.2f}s")
+
+
+scheduler = RequestScheduler()
+atexit.register(lambda: print(f"[DEBUG] Scheduler: {scheduler.report()}", file=sys.stderr))
 
 SYSTEM_PROMPT1 = """
 You are Grok, a helpful and maximally truthful AI built by xAI.
@@ -245,7 +548,7 @@ You are Grok, a helpful and maximally truthful AI built by xAI.
 Do not use the phrase "Think of [analogy/example]" or "Think [example]"
 to explain anything.
 
-The system message will include a single "MODE: <name>" 
+The last system message of each request will include a single "MODE: <name>" 
 line instructing how long and what style to produce.
 Follow these MODE rules exactly:
 
@@ -271,24 +574,1246 @@ Avoid using 'super' as an intensifier.
 
 """.strip()
 
+# Everything that is the same for every request.  It goes first, followed by
+# the history, so consecutive requests share a byte-identical prefix that the
+# provider can serve from its prompt cache.  Per-turn directives (MODE,
+# Cogitate) go last.
+SYSTEM_PREFIX = SYSTEM_PROMPT2 + "\n\n" + AVOIDANCE_FOR_SESSION.strip()
+
+
+def message_text(msg: Dict[str, str]) -> str:
+    """What the model is sent for a message: a progressive reply's long answer replaces its short one."""
+    return msg.get("long") or msg["content"]
+
 
-def generate_response_raw(messages: List[Dict[str, str]], addition: str = "", model: str | None = None) -> str:
-    # Prepend the real system message if it's not already there
-    full_messages = [{"role": "system", "content": SYSTEM_PROMPT2 + addition}]
+def _build_messages(messages: List[Dict[str, str]], addition: str = "") -> List[Dict[str, str]]:
+    """[constant system prompt] + history + [this turn's directives]."""
+    full_messages = [{"role": "system", "content": SYSTEM_PREFIX}]
     for msg in messages:
-        if msg["role"] == "assistant":  # llm library uses "assistant", xAI accepts it
-            full_messages.append(msg)
-        else:
-            full_messages.append({"role": "user", "content": msg["content"]})
+        # Copy only what the API needs, so bookkeeping keys never change the prefix.
+        # "system" entries are notes added by ContextBudgeter, never user text.
+        role = msg["role"] if msg["role"] in ("assistant", "system") else "user"
+        full_messages.append({"role": role, "content": message_text(msg)})
+    if addition.strip():
+        full_messages.append({"role": "system", "content": addition.strip()})
+    return full_messages
 
-    model_to_use = model or GROK_MODEL
-    response = client.chat.completions.create(
-        model=model_to_use,
-        messages=full_messages,
-        temperature=0.5,
-        max_tokens=2048,
+
+# Prompt-cache accounting, from the `usage` block of each response
+_usage_lock = threading.Lock()
+_usage_totals = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+
+def record_usage(model: str, usage) -> None:
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    prompt = usage.prompt_tokens or 0
+    with _usage_lock:
+        _usage_totals["requests"] += 1
+        _usage_totals["prompt_tokens"] += prompt
+        _usage_totals["cached_tokens"] += cached
+        _usage_totals["completion_tokens"] += usage.completion_tokens or 0
+    print(f"[DEBUG] {model}: {prompt} prompt tokens, {cached} cached, "
+          f"{usage.completion_tokens} completion", file=sys.stderr)
+
+
+def usage_report() -> str:
+    with _usage_lock:
+        u = dict(_usage_totals)
+    share = 100.0 * u["cached_tokens"] / u["prompt_tokens"] if u["prompt_tokens"] else 0.0
+    return (f"{u['requests']} requests, {u['prompt_tokens']} prompt tokens, "
+            f"{u['cached_tokens']} served from cache ({share:.0f}%), {u['completion_tokens']} completion tokens")
+
+
+atexit.register(lambda: print(f"[DEBUG] Token usage: {usage_report()}", file=sys.stderr))
+
+
+# Completion lengths seen per mode, for tuning GrokChatBot.mode_profiles
+_mode_output_stats: Dict[str, Dict] = {}
+
+
+def record_mode_output(mode: str, tokens: int, limit: int, truncated: bool) -> None:
+    with _usage_lock:
+        st = _mode_output_stats.setdefault(mode, {"lengths": [], "truncated": 0, "limit": limit})
+        st["lengths"].append(tokens)
+        st["limit"] = limit
+        st["truncated"] += int(truncated)
+
+
+def mode_output_report() -> str:
+    lines = []
+    with _usage_lock:
+        for mode, st in sorted(_mode_output_stats.items()):
+            lengths = sorted(st["lengths"])
+            p95 = lengths[min(len(lengths) - 1, int(len(lengths) * 0.95))]
+            lines.append(f"{mode}: n={len(lengths)} mean={sum(lengths) / len(lengths):.0f} p95={p95} "
+                         f"max={lengths[-1]} limit={st['limit']} cut off={st['truncated']}")
+    return "; ".join(lines) or "no replies"
+
+
+atexit.register(lambda: print(f"[DEBUG] Output tokens by mode: {mode_output_report()}", file=sys.stderr))
+
+
+# ----------------------------------------------------------------------
+# Response cache
+# ----------------------------------------------------------------------
+def response_cache_key(messages: List[Dict[str, str]], addition: str, model: str,
+                       profile: Dict | None = None) -> str:
+    """sha256 of the request as sent, with whitespace normalized."""
+    normalized = [[m["role"], " ".join(message_text(m).split())] for m in messages]
+    payload = json.dumps([normalized, " ".join(addition.split()), model, profile or {}],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU of finished replies in memory, backed by a small SQLite table.
+
+    Entries expire after `ttl` seconds; the table is trimmed to `max_rows` by
+    last use.  The database is only opened on first use, so nothing is written
+    unless the cache is switched on.
+    """
+
+    def __init__(self, path: str = os.path.join(APP_DATA_DIR, "responses.sqlite3"),
+                 memory_items: int = RESPONSE_CACHE_MEMORY_ITEMS,
+                 max_rows: int = RESPONSE_CACHE_MAX_ROWS, ttl: float = RESPONSE_CACHE_TTL):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "stores": 0}
+        self._lock = threading.Lock()
+        self._memory = collections.OrderedDict()  # key -> (reply, created)
+        self._db = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                             "key TEXT PRIMARY KEY, model TEXT, reply TEXT, created REAL, last_used REAL)")
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            self._db.commit()
+        return self._db
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                try:
+                    row = self._conn().execute(
+                        "SELECT reply, created FROM responses WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    print(f"[DEBUG] Response cache read failed: {e}", file=sys.stderr)
+                    row = None
+                entry = tuple(row) if row else None
+            if entry is None or now - entry[1] > self.ttl:
+                self.stats["misses"] += 1
+                if entry is not None:
+                    self._memory.pop(key, None)
+                return None
+            self._remember(key, entry)
+            try:
+                self._conn().execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn().commit()
+            except sqlite3.Error:
+                pass
+            self.stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key: str, reply: str, model: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, (reply, now))
+            self.stats["stores"] += 1
+            try:
+                db = self._conn()
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                           (key, model, reply, now, now))
+                (rows,) = db.execute("SELECT COUNT(*) FROM responses").fetchone()
+                if rows > self.max_rows:
+                    db.execute("DELETE FROM responses WHERE key IN "
+                               "(SELECT key FROM responses ORDER BY last_used LIMIT ?)", (rows - self.max_rows,))
+                db.commit()
+            except sqlite3.Error as e:
+                print(f"[DEBUG] Response cache write failed: {e}", file=sys.stderr)
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def report(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        return f"{s['hits']} hits, {s['misses']} misses, {s['stores']} stored"
+
+
+response_cache = ResponseCache()
+atexit.register(lambda: print(f"[DEBUG] Response cache: {response_cache.report()}", file=sys.stderr))
+
+
+# ----------------------------------------------------------------------
+# Session store
+# ----------------------------------------------------------------------
+class SessionStore:
+    """Every session's turns in APP_DATA_DIR/sessions.sqlite3 (WAL mode).
+
+    The UI thread only queues writes; one writer thread commits whatever has
+    queued up in a single transaction, so saving a turn costs one INSERT and
+    never waits on the disk.  Reads use their own connection (WAL lets them
+    run alongside the writer).
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY, title TEXT, created REAL, updated REAL);
+        CREATE TABLE IF NOT EXISTS turns (
+            session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL,
+            content TEXT NOT NULL, long TEXT, mode TEXT, model TEXT, created REAL,
+            latency REAL, first_token REAL,
+            prompt_tokens INTEGER, cached_tokens INTEGER, completion_tokens INTEGER,
+            label TEXT,
+            PRIMARY KEY (session_id, seq));
+        CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
+            content, long, content='turns', content_rowid='rowid');
+        CREATE TRIGGER IF NOT EXISTS turns_fts_insert AFTER INSERT ON turns BEGIN
+            INSERT INTO turns_fts (rowid, content, long) VALUES (new.rowid, new.content, new.long);
+        END;
+        CREATE TRIGGER IF NOT EXISTS turns_fts_delete AFTER DELETE ON turns BEGIN
+            INSERT INTO turns_fts (turns_fts, rowid, content, long)
+            VALUES ('delete', old.rowid, old.content, old.long);
+        END;
+        CREATE TRIGGER IF NOT EXISTS turns_fts_update AFTER UPDATE ON turns BEGIN
+            INSERT INTO turns_fts (turns_fts, rowid, content, long)
+            VALUES ('delete', old.rowid, old.content, old.long);
+            INSERT INTO turns_fts (rowid, content, long) VALUES (new.rowid, new.content, new.long);
+        END;
+    """
+
+    def __init__(self, path: str = os.path.join(APP_DATA_DIR, "sessions.sqlite3")):
+        self.path = path
+        self.stats = {"writes": 0, "batches": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._reader = None  # connection for search(), opened on first use
+        self._migrate_lock = threading.Lock()
+        self._migrated = False
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # durable at each checkpoint; safe against app crashes
+        # INSERT OR REPLACE only fires the delete trigger (keeping turns_fts in step) with this on
+        conn.execute("PRAGMA recursive_triggers=ON")
+        # The writer and the reader connect from different threads; only the first sets up the file
+        with self._migrate_lock:
+            if not self._migrated:
+                self._migrate(conn)
+                self._migrated = True
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        had_index = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'turns_fts'").fetchone() is not None
+        conn.executescript(self._SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(turns)")}
+        if "label" not in columns:
+            # Stores from before exchange labels were saved
+            try:
+                with conn:
+                    conn.execute("ALTER TABLE turns ADD COLUMN label TEXT")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e):
+                    raise  # otherwise another running copy of the app added it first
+        if not had_index:
+            # Turns saved before the search index existed
+            with conn:
+                conn.execute("INSERT INTO turns_fts (turns_fts) VALUES ('rebuild')")
+
+    # -- writes (any thread; queued) ------------------------------------
+    def _put(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put((sql, params))
+
+    def append_turn(self, session_id: str, seq: int, role: str, content: str, meta: Dict | None = None) -> None:
+        meta = meta or {}
+        now = time.time()
+        usage = meta.get("usage")
+        details = getattr(usage, "prompt_tokens_details", None)
+        title = content[:80] if role == "user" else None
+        self._put("INSERT INTO sessions (id, title, created, updated) VALUES (?, ?, ?, ?) "
+                  "ON CONFLICT(id) DO UPDATE SET updated = excluded.updated, "
+                  "title = COALESCE(sessions.title, excluded.title)",
+                  (session_id, title, now, now))
+        self._put("INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?, NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                  (session_id, seq, role, content, meta.get("mode"), meta.get("model"), now,
+                   meta.get("latency"), meta.get("first_token"),
+                   getattr(usage, "prompt_tokens", None),
+                   getattr(details, "cached_tokens", None) if details is not None else None,
+                   getattr(usage, "completion_tokens", None), meta.get("label")))
+
+    def set_long(self, session_id: str, seq: int, text: str) -> None:
+        self._put("UPDATE turns SET long = ? WHERE session_id = ? AND seq = ?", (text, session_id, seq))
+
+    def delete_turns(self, session_id: str, seq: int, count: int) -> None:
+        """Delete turns seq..seq+count-1 and renumber the later ones to follow on."""
+        self._put("DELETE FROM turns WHERE session_id = ? AND seq >= ? AND seq < ?",
+                  (session_id, seq, seq + count))
+        # Through negative numbers, so no step collides with a row not yet moved
+        self._put("UPDATE turns SET seq = -seq - 1 WHERE session_id = ? AND seq >= ?", (session_id, seq + count))
+        self._put("UPDATE turns SET seq = -seq - 1 - ? WHERE session_id = ? AND seq < 0",
+                  (count, session_id))
+
+    def import_export(self, path: str) -> int:
+        """Add an exported chat_session_*.txt file as a session; returns the number of turns.
+
+        The session id comes from the file's path, so importing a file again
+        replaces its earlier import instead of duplicating it.
+        """
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        turns = parse_export_text(text)
+        if not turns:
+            return 0
+        path = os.path.abspath(path)
+        session_id = "import:" + hashlib.sha1(path.encode("utf-8")).hexdigest()[:16]
+        created = os.path.getmtime(path)
+        title = next((content[:80] for role, content in turns if role == "user"), os.path.basename(path))
+        self._put("INSERT OR REPLACE INTO sessions (id, title, created, updated) VALUES (?, ?, ?, ?)",
+                  (session_id, title, created, created))
+        self._put("DELETE FROM turns WHERE session_id = ?", (session_id,))
+        for seq, (role, content) in enumerate(turns):
+            self._put("INSERT INTO turns (session_id, seq, role, content, created) VALUES (?, ?, ?, ?, ?)",
+                      (session_id, seq, role, content, created))
+        return len(turns)
+
+    def _run(self) -> None:
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"[DEBUG] Session store unavailable: {e}", file=sys.stderr)
+            return
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < SESSION_STORE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            waiters = []
+            try:
+                with conn:  # one transaction per batch
+                    for sql, params in batch:
+                        if sql is None:
+                            waiters.append(params)
+                        else:
+                            conn.execute(sql, params)
+                            self.stats["writes"] += 1
+                self.stats["batches"] += 1
+            except sqlite3.Error as e:
+                print(f"[DEBUG] Session store write failed: {e}", file=sys.stderr)
+            for event in waiters:
+                event.set()
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until everything queued so far is committed."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    # -- reads -----------------------------------------------------------
+    def load_turns(self, session_id: str) -> List[Dict]:
+        self.flush()
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute("SELECT * FROM turns WHERE session_id = ? ORDER BY seq", (session_id,))
+            return [dict(row) for row in rows]
+        finally:
+            conn.close()
+
+    def search(self, query: str, limit: int = 50) -> List[Dict]:
+        """Turns matching `query`, best first (bm25), each with a highlighted snippet.
+
+        The words of `query` are matched as given (the last one as a prefix);
+        in the snippet, matches are wrapped in SEARCH_MARK_START/SEARCH_MARK_END.
+        Scoring costs time per match, so a word found in most messages would
+        take far longer than a rare one; only the newest SEARCH_RANK_WINDOW
+        matches are ranked (a cheap rowid-ordered scan finds where they start).
+        """
+        terms = ['"' + word.replace('"', '""') + '"' for word in query.split()]
+        if not terms:
+            return []
+        terms[-1] += "*"
+        match = " ".join(terms)
+        with self._lock:
+            if self._reader is None:
+                self._reader = self._connect()
+                self._reader.row_factory = sqlite3.Row
+            rows = self._reader.execute(
+                "SELECT t.session_id, t.seq, t.role, t.created, s.title, "
+                "       snippet(turns_fts, -1, ?, ?, '…', 16) AS snippet "
+                "FROM turns_fts JOIN turns t ON t.rowid = turns_fts.rowid "
+                "LEFT JOIN sessions s ON s.id = t.session_id "
+                "WHERE turns_fts MATCH ? AND turns_fts.rowid >= ("
+                "    SELECT min(rowid) FROM (SELECT rowid FROM turns_fts WHERE turns_fts MATCH ? "
+                "                            ORDER BY rowid DESC LIMIT ?)) "
+                "ORDER BY rank LIMIT ?",
+                (SEARCH_MARK_START, SEARCH_MARK_END, match, match, SEARCH_RANK_WINDOW, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def report(self) -> str:
+        return f"{self.stats['writes']} writes in {self.stats['batches']} transactions"
+
+
+SEARCH_MARK_START, SEARCH_MARK_END = "\x02", "\x03"  # around matches in search() snippets
+_EXPORT_SPEAKER = re.compile(r"(?:^|\n\n)(You|Grok): ")
+
+
+def parse_export_text(text: str) -> List[tuple]:
+    """Split export_session text back into (role, content) turns.
+
+    The greeting and other notices before the first "You:" are dropped.
+    """
+    parts = _EXPORT_SPEAKER.split(text)
+    turns = []
+    for speaker, content in zip(parts[1::2], parts[2::2]):
+        if speaker == "You":
+            turns.append(("user", content.strip()))
+        elif turns:
+            turns.append(("assistant", content.strip()))
+    return turns
+
+
+session_store = SessionStore() if SESSION_STORE_ENABLED else None
+
+
+def _close_session_store() -> None:
+    if session_store is not None:
+        session_store.flush()
+        print(f"[DEBUG] Session store: {session_store.report()}", file=sys.stderr)
+
+
+atexit.register(_close_session_store)
+
+
+class SessionJournal:
+    """Append-only crash journal, APP_DATA_DIR/journal/<session_id>.jsonl per window.
+
+    Each turn is one JSON line.  A writer thread writes whatever has queued up
+    and fsyncs each touched file once per batch, then waits
+    JOURNAL_FSYNC_INTERVAL so the next batch can build up.  Closing a window
+    cleanly discards its journal, so any journal found at startup belongs to
+    a window that was lost and can be restored from it.
+    """
+
+    def __init__(self, directory: str = os.path.join(APP_DATA_DIR, "journal"),
+                 interval: float = JOURNAL_FSYNC_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.stats = {"records": 0, "fsyncs": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    # -- writes (any thread; queued) ------------------------------------
+    def _put(self, item: tuple) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+
+    def append(self, session_id: str, record: Dict) -> None:
+        self._put(("append", session_id, json.dumps(record, ensure_ascii=False) + "\n"))
+
+    def discard(self, session_id: str) -> None:
+        """Delete the session's journal (after what is queued for it)."""
+        self._put(("discard", session_id, None))
+
+    def _run(self) -> None:
+        files = {}
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            touched, waiters = set(), []
+            for op, session_id, data in batch:
+                try:
+                    if op == "append":
+                        f = files.get(session_id)
+                        if f is None:
+                            os.makedirs(self.directory, exist_ok=True)
+                            f = files[session_id] = open(self.path(session_id), "a", encoding="utf-8")
+                        f.write(data)
+                        touched.add(session_id)
+                        self.stats["records"] += 1
+                    elif op == "discard":
+                        f = files.pop(session_id, None)
+                        if f is not None:
+                            f.close()
+                        touched.discard(session_id)
+                        if os.path.exists(self.path(session_id)):
+                            os.remove(self.path(session_id))
+                    else:
+                        waiters.append(data)
+                except OSError as e:
+                    print(f"[DEBUG] Journal write failed for {session_id}: {e}", file=sys.stderr)
+            for session_id in touched:
+                try:
+                    f = files[session_id]
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.stats["fsyncs"] += 1
+                except OSError as e:
+                    print(f"[DEBUG] Journal fsync failed for {session_id}: {e}", file=sys.stderr)
+            for event in waiters:
+                event.set()
+            if touched and not waiters:
+                time.sleep(self.interval)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until everything queued so far is on disk."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(("flush", None, done))
+        return done.wait(timeout)
+
+    # -- restore ---------------------------------------------------------
+    def leftovers(self) -> List[str]:
+        """Session ids of journals left behind by windows that were not closed, oldest first."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".jsonl")]
+        except OSError:
+            return []
+        names.sort(key=lambda n: os.path.getmtime(os.path.join(self.directory, n)))
+        return [n[:-len(".jsonl")] for n in names]
+
+    def load(self, session_id: str) -> tuple:
+        """Replay a journal into (conversation, exchanges) where exchanges are (conv index, mode label)."""
+        conversation, exchanges = [], []
+        with open(self.path(session_id), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # a line torn by the crash
+                seq = rec.get("seq", -1)
+                if rec.get("t") == "turn" and 0 <= seq <= len(conversation):
+                    msg = {"role": rec["role"], "content": rec["content"]}
+                    del conversation[seq:]
+                    conversation.append(msg)
+                    while exchanges and exchanges[-1][0] >= seq:
+                        exchanges.pop()
+                    if "exchange" in rec:
+                        exchanges.append((seq, rec["exchange"]))
+                elif rec.get("t") == "long" and 0 <= seq < len(conversation):
+                    conversation[seq]["long"] = rec["text"]
+                elif rec.get("t") == "delete" and 0 <= seq < len(conversation):
+                    count = rec["count"]
+                    del conversation[seq:seq + count]
+                    exchanges = [(conv - count if conv >= seq + count else conv, label)
+                                 for conv, label in exchanges if not seq <= conv < seq + count]
+        return conversation, exchanges
+
+    def report(self) -> str:
+        return f"{self.stats['records']} records, {self.stats['fsyncs']} fsyncs"
+
+
+session_journal = SessionJournal() if JOURNAL_ENABLED else None
+
+
+def _close_session_journal() -> None:
+    if session_journal is not None:
+        session_journal.flush()
+        print(f"[DEBUG] Session journal: {session_journal.report()}", file=sys.stderr)
+
+
+atexit.register(_close_session_journal)
+
+
+# ----------------------------------------------------------------------
+# Context budget
+# ----------------------------------------------------------------------
+_MESSAGE_OVERHEAD = 4  # role/separator tokens per message
+_token_scale: Dict[str, float] = {}  # model -> actual / estimated prompt tokens
+
+
+def estimate_tokens(msg: Dict[str, str]) -> int:
+    """Unscaled token estimate for one message, cached on it as "_tokens"."""
+    est = msg.get("_tokens")
+    if est is None:
+        est = int(len(message_text(msg)) / CHARS_PER_TOKEN) + _MESSAGE_OVERHEAD
+        msg["_tokens"] = est
+    return est
+
+
+def calibrate_tokens(model: str, estimated: int, actual: int | None) -> None:
+    """Fold a request's real prompt_tokens into the model's estimate correction."""
+    if not estimated or not actual:
+        return
+    ratio = min(3.0, max(0.3, actual / estimated))
+    old = _token_scale.get(model)
+    _token_scale[model] = ratio if old is None else 0.7 * old + 0.3 * ratio
+    print(f"[DEBUG] Prompt estimate {estimated} vs actual {actual} tokens; "
+          f"scale for {model} now {_token_scale[model]:.2f}", file=sys.stderr)
+
+
+class ContextBudgeter:
+    """Chooses which part of a session's conversation is sent with each request.
+
+    The oldest turns are dropped once the (calibrated) estimate passes the
+    model's budget.  It then trims well below the budget, so the first kept
+    message — and with it the cached prompt prefix — stays put for several
+    turns instead of sliding every request.  The latest exchange is always sent.
+    """
+
+    def __init__(self):
+        self.start = 0  # index of the first conversation message sent
+        self.summary = None  # {"upto": n, "content": text} summarizing conversation[:n]
+
+    def reset(self) -> None:
+        self.start = 0
+        self.summary = None
+
+    def forget(self, lo: int, hi: int) -> None:
+        """conversation[lo:hi] was deleted; keep pointing at the same remaining turns."""
+        if self.summary is not None and lo < self.summary["upto"]:
+            self.reset()  # the summary covers deleted turns; compaction will write a new one
+            return
+        if self.start >= hi:
+            self.start -= hi - lo
+        elif self.start > lo:
+            self.start = lo
+
+    def set_summary(self, upto: int, content: str) -> None:
+        self.summary = {"upto": upto, "content": content}
+        self.start = max(self.start, upto)
+
+    def compaction_block(self, conversation: List[Dict[str, str]]) -> Tuple[int, int] | None:
+        """Return (lo, hi): the oldest unsummarized messages worth folding into the summary.
+
+        None until the unsummarized history passes SUMMARY_TRIGGER_TOKENS.  The
+        block always ends right before a user message so the history sent after
+        it still opens with a user turn.
+        """
+        lo = self.summary["upto"] if self.summary else 0
+        limit = len(conversation) - SUMMARY_KEEP_RECENT
+        if limit <= lo or sum(estimate_tokens(m) for m in conversation[lo:]) < SUMMARY_TRIGGER_TOKENS:
+            return None
+        hi, size = lo, 0
+        end = None
+        while hi < limit:
+            size += estimate_tokens(conversation[hi])
+            hi += 1
+            if conversation[hi]["role"] == "user":
+                end = hi
+                if size >= SUMMARY_BLOCK_TOKENS:
+                    break
+        return (lo, end) if end else None
+
+    def window(self, conversation: List[Dict[str, str]], addition: str, model: str) -> Tuple[list, int]:
+        """Return (messages to send, unscaled estimate of the whole prompt)."""
+        budget = CONTEXT_BUDGETS.get(model, CONTEXT_BUDGET_DEFAULT)
+        scale = _token_scale.get(model, 1.0)
+        messages = list(conversation)
+        sizes = [estimate_tokens(m) for m in messages]
+        fixed = estimate_tokens({"content": SYSTEM_PREFIX}) + estimate_tokens({"content": addition})
+        if self.start > len(messages):
+            self.start = 0
+        if self.summary and self.start < self.summary["upto"]:
+            self.start = self.summary["upto"]
+
+        if (fixed + sum(sizes[self.start:])) * scale > budget:
+            last_user = max((i for i, m in enumerate(messages) if m["role"] == "user"), default=0)
+            target = budget * CONTEXT_TRIM_TO
+            start = self.start
+            kept = sum(sizes[start:])
+            while start < last_user and (fixed + kept) * scale > target:
+                kept -= sizes[start]
+                start += 1
+            # History has to open with a user turn
+            while start < last_user and messages[start]["role"] != "user":
+                kept -= sizes[start]
+                start += 1
+            print(f"[DEBUG] Context over budget ({budget}); dropping messages {self.start}..{start - 1}",
+                  file=sys.stderr)
+            self.start = start
+
+        history = messages[self.start:]
+        estimate = fixed + sum(sizes[self.start:])
+        if self.summary:
+            content = "Summary of the earlier conversation:\n" + self.summary["content"]
+            if self.start > self.summary["upto"]:
+                content += "\n(Some messages after this summary were also left out to save space.)"
+            note = {"role": "system", "content": content}
+        elif self.start:
+            note = {"role": "system", "content": f"({self.start} earlier messages of this conversation "
+                                                  f"were left out to save space.)"}
+        if self.summary or self.start:
+            history.insert(0, note)
+            estimate += estimate_tokens(note)
+        return history, estimate
+
+
+class RequestCancelled(Exception):
+    """The request was cancelled while it was still waiting for the server."""
+
+
+class RequestHandle:
+    """Cancellation handle for one in-flight completion (the Tk side of app.js's AbortController).
+
+    cancel() may be called from the UI thread at any time: it closes the HTTP
+    stream, which ends the worker's read loop and releases the connection.
+    """
+
+    def __init__(self):
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._stream = None
+        self.usage = None  # set from the final stream chunk
+        self.finish_reason = None  # "stop", or "length" when max_tokens cut the reply off
+        self._children = []
+        self._waiter = None  # Event of a call() in progress
+
+    def call(self, fn):
+        """Run blocking fn() so that cancel() can abandon it while it waits for headers.
+
+        fn runs on a helper thread; a stream it returns after a cancel is closed
+        by attach().  Raises RequestCancelled if cancelled first.
+        """
+        done = threading.Event()
+        box = {}
+
+        def run():
+            try:
+                result = box["result"] = fn()
+                if self.cancelled.is_set() and hasattr(result, "close"):
+                    result.close()  # nobody is waiting for it any more
+            except BaseException as e:
+                box["error"] = e
+            finally:
+                done.set()
+
+        with self._lock:
+            if self.cancelled.is_set():
+                raise RequestCancelled()
+            self._waiter = done
+        threading.Thread(target=run, daemon=True).start()
+        done.wait()
+        with self._lock:
+            self._waiter = None
+        if "error" in box:
+            raise box["error"]
+        if "result" not in box:
+            raise RequestCancelled()
+        return box["result"]
+
+    def child(self) -> "RequestHandle":
+        """A handle for a sub-request that is cancelled along with this one."""
+        handle = RequestHandle()
+        with self._lock:
+            self._children.append(handle)
+            cancelled = self.cancelled.is_set()
+        if cancelled:
+            handle.cancel()
+        return handle
+
+    def attach(self, stream) -> None:
+        with self._lock:
+            self._stream = stream
+            if not self.cancelled.is_set():
+                return
+        # Cancelled while the request was still waiting for headers
+        stream.close()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled.set()
+            stream = self._stream
+            children = list(self._children)
+            if self._waiter is not None:
+                self._waiter.set()
+        for handle in children:
+            handle.cancel()
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                print(f"[DEBUG] Closing cancelled stream failed: {e}", file=sys.stderr)
+
+
+# ----------------------------------------------------------------------
+# Retry engine for 429 / 5xx / dropped connections
+# ----------------------------------------------------------------------
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, openai.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in _RETRYABLE_STATUS
+    return False
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """Seconds the server asked us to wait (retry-after-ms / Retry-After), if any."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP-date form
+            when = email.utils.parsedate_to_datetime(value)
+            return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retries(fn, handle: RequestHandle | None = None, on_retry=None,
+                      deadline: float = REQUEST_DEADLINE, max_attempts: int = RETRY_MAX_ATTEMPTS):
+    """Call fn(), retrying transient API failures.
+
+    Waits Retry-After when the server sends it, otherwise exponential backoff
+    with full jitter.  Gives up (re-raising the last error) after max_attempts
+    or when the next try would start past `deadline` seconds; a cancel during
+    the wait raises RequestCancelled.
+    on_retry(attempt, delay, exc) is called before each wait.
+    """
+    give_up_at = time.monotonic() + deadline
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as e:
+            attempt += 1
+            if not _is_retryable(e) or attempt >= max_attempts:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            if time.monotonic() + delay > give_up_at:
+                print(f"[DEBUG] Not retrying: {delay:.1f}s wait would pass the deadline", file=sys.stderr)
+                raise
+            print(f"[DEBUG] Attempt {attempt} failed ({e.__class__.__name__}); retrying in {delay:.1f}s",
+                  file=sys.stderr)
+            if on_retry is not None:
+                on_retry(attempt, delay, e)
+            if handle is not None:
+                if handle.cancelled.wait(delay):
+                    raise RequestCancelled() from e
+            else:
+                time.sleep(delay)
+
+
+# ----------------------------------------------------------------------
+# Circuit breaker per model
+# ----------------------------------------------------------------------
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose breaker is open (and has no usable fallback)."""
+
+
+class CircuitBreaker:
+    """Tracks recent failures/slow calls for one model.
+
+    closed -> open when BREAKER_FAILURE_RATE of the last BREAKER_WINDOW calls
+    failed or took longer than BREAKER_SLOW_CALL to start answering.  After
+    BREAKER_COOLDOWN one trial call is allowed (half-open); its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = "closed"
+        self.trips = 0
+        self._lock = threading.Lock()
+        self._recent = collections.deque(maxlen=BREAKER_WINDOW)  # True = bad call
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < BREAKER_COOLDOWN:
+                    return False
+                self.state = "half_open"
+                self._trial_running = False
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def retry_in(self) -> float:
+        return max(0.0, BREAKER_COOLDOWN - (time.monotonic() - self._opened_at))
+
+    def record(self, ok: bool, latency: float | None = None) -> None:
+        """Report the outcome of a call let through by allow()."""
+        bad = not ok or (latency is not None and latency > BREAKER_SLOW_CALL)
+        with self._lock:
+            if self.state == "half_open":
+                self._trial_running = False
+                if bad:
+                    self._open()
+                else:
+                    self.state = "closed"
+                    self._recent.clear()
+                    print(f"[DEBUG] Circuit for {self.model} closed", file=sys.stderr)
+                return
+            self._recent.append(bad)
+            if (self.state == "closed" and len(self._recent) >= BREAKER_MIN_CALLS
+                    and sum(self._recent) / len(self._recent) >= BREAKER_FAILURE_RATE):
+                self._open()
+
+    def abandon(self) -> None:
+        """A call let through by allow() was cancelled; it tells us nothing."""
+        with self._lock:
+            self._trial_running = False
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        self._recent.clear()
+        print(f"[DEBUG] Circuit for {self.model} opened for {BREAKER_COOLDOWN:.0f}s", file=sys.stderr)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model)
+        return _breakers[model]
+
+
+def choose_model(model: str) -> Tuple[str, str | None]:
+    """Return (model to call, substitution note or None); raises CircuitOpenError to fail fast."""
+    if breaker_for(model).allow():
+        return model, None
+    fallback = MODEL_FALLBACKS.get(model)
+    if fallback and breaker_for(fallback).allow():
+        print(f"[DEBUG] {model} circuit open; falling back to {fallback}", file=sys.stderr)
+        return fallback, f"{model} is having trouble — answered by {fallback}"
+    raise CircuitOpenError(f"{model} is failing right now; try again in {breaker_for(model).retry_in():.0f}s.")
+
+
+def breaker_report() -> str:
+    with _breakers_lock:
+        return ", ".join(f"{m}: {b.state}, opened {b.trips}x" for m, b in _breakers.items()) or "no calls"
+
+
+atexit.register(lambda: print(f"[DEBUG] Circuit breakers: {breaker_report()}", file=sys.stderr))
+
+
+SUMMARY_PROMPT = """
+You keep a running summary of a chat between a user and Grok (an AI assistant).
+Merge the previous summary with the new messages into one updated summary.
+Keep facts, names, numbers, decisions, code identifiers, user preferences and
+open questions; drop small talk and wording.  Use short bullet points, at most
+400 words.  Output only the summary.
+""".strip()
+
+
+def summarize_history(previous: str | None, messages: List[Dict[str, str]],
+                      handle: RequestHandle | None = None, model: str = GROK_MODEL) -> str:
+    """Fold `messages` into the rolling summary `previous` (background compaction)."""
+    transcript = "\n\n".join(
+        f"{'Grok' if m['role'] == 'assistant' else 'User'}: {_STREAM_REASONING_RE.sub('', m['content']).strip()}"
+        for m in messages
     )
+    parts = []
+    if previous:
+        parts.append("Previous summary:\n" + previous)
+    parts.append("New messages:\n" + transcript)
+    response = call_with_retries(lambda: client.chat.completions.create(
+        model=model,
+        messages=[{"role": "system", "content": SUMMARY_PROMPT},
+                  {"role": "user", "content": "\n\n".join(parts)}],
+        temperature=0.2,
+        max_tokens=SUMMARY_MAX_TOKENS,
+    ), handle=handle)
+    record_usage(model, response.usage)
     return response.choices[0].message.content.strip()
+
+
+def generate_response_stream(messages: List[Dict[str, str]], addition: str = "", model: str | None = None,
+                             handle: RequestHandle | None = None, on_retry=None,
+                             profile: Dict | None = None) -> Iterator[str]:
+    """Ask Grok for a reply to `messages` + `addition`, yielding it as text deltas.
+
+    `profile` overrides the generation settings (max_tokens, temperature, stop).
+    Only opening the stream is retried; once text has been shown a failure is
+    reported instead.  Stops early (without raising) once `handle` is cancelled.
+    """
+    model_to_use = model or GROK_MODEL
+    settings = {"temperature": 0.5, "max_tokens": 2048}
+    settings.update(profile or {})
+
+    def open_stream():
+        return client.chat.completions.create(
+            model=model_to_use,
+            messages=_build_messages(messages, addition),
+            **settings,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+    if handle is None:
+        stream = call_with_retries(open_stream, on_retry=on_retry)
+    else:
+        stream = call_with_retries(lambda: handle.call(open_stream), handle=handle, on_retry=on_retry)
+        handle.attach(stream)
+    try:
+        for chunk in stream:
+            if handle is not None and handle.cancelled.is_set():
+                break
+            if getattr(chunk, "usage", None) is not None:
+                record_usage(model_to_use, chunk.usage)
+                if handle is not None:
+                    handle.usage = chunk.usage
+            if not chunk.choices:
+                continue
+            if chunk.choices[0].finish_reason and handle is not None:
+                handle.finish_reason = chunk.choices[0].finish_reason
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        stream.close()
+
+
+# ----------------------------------------------------------------------
+# Hedged requests
+# ----------------------------------------------------------------------
+_hedge_stats = {"hedged": 0, "fired": 0, "backup_won": 0, "no_slot": 0}
+_hedge_lock = threading.Lock()
+# Backups run on their own threads, outside the scheduler's workers (which are busy
+# running the primaries they back up), but only this many at once
+_hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_BACKUPS)
+
+
+class HedgedRequest:
+    """Backup request for a primary that is slow to start answering.
+
+    The caller streams the primary under `self.primary` and sets `first_token`
+    when text arrives.  If that hasn't happened `delay` seconds after start()
+    and one of the HEDGE_MAX_BACKUPS backup slots is free, the same messages
+    go to `backup_model` on the waiting thread itself.  Whichever finishes
+    first wins and the other is cancelled.  Both handles are children of the
+    user's request, so cancelling it stops both.
+    """
+
+    def __init__(self, parent: RequestHandle, backup_model: str, messages: List[Dict[str, str]],
+                 addition: str, profile: Dict | None = None, delay: float = HEDGE_AFTER, on_fire=None):
+        self.primary = parent.child()
+        self.backup = parent.child()
+        self.backup_model = backup_model
+        self.first_token = threading.Event()
+        self.fired = False
+        self.winner = None  # "primary" or "backup"
+        self.reply = None   # backup's reply when it won
+        self._args = (messages, addition, profile)
+        self._delay = delay
+        self._on_fire = on_fire
+        self._lock = threading.Lock()
+        self._finished = False  # the backup has run (or given up)
+        self._then = None       # set by primary_failed while the backup is still running
+        self._started = time.monotonic()
+
+    def start(self) -> None:
+        with _hedge_lock:
+            _hedge_stats["hedged"] += 1
+        threading.Thread(target=self._wait, daemon=True).start()
+
+    def _wait(self) -> None:
+        self.first_token.wait(self._delay)
+        with self._lock:
+            if self.first_token.is_set() or self.winner is not None or self.primary.cancelled.is_set():
+                return
+            if not _hedge_slots.acquire(blocking=False):
+                with _hedge_lock:
+                    _hedge_stats["no_slot"] += 1
+                print("[DEBUG] No token yet, but every backup slot is busy; not hedging", file=sys.stderr)
+                return
+            self.fired = True
+        with _hedge_lock:
+            _hedge_stats["fired"] += 1
+        print(f"[DEBUG] No token after {self._delay:.0f}s; hedging with {self.backup_model}", file=sys.stderr)
+        try:
+            if self._on_fire is not None:
+                self._on_fire()
+            self._run()
+        finally:
+            _hedge_slots.release()
+            with self._lock:
+                self._finished = True
+                then = self._then
+            if then is not None:
+                then()
+
+    def _run(self) -> None:
+        breaker = breaker_for(self.backup_model)
+        if not breaker.allow():
+            print(f"[DEBUG] Hedge: {self.backup_model} circuit open; no backup", file=sys.stderr)
+            return
+        messages, addition, profile = self._args
+        started = time.monotonic()
+        first_token = None
+        parts = []
+        try:
+            for delta in generate_response_stream(messages, addition, self.backup_model,
+                                                  self.backup, None, profile):
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                parts.append(delta)
+        except Exception as e:
+            if self.backup.cancelled.is_set() or not _is_retryable(e):
+                breaker.abandon()
+            else:
+                breaker.record(False)
+            print(f"[DEBUG] Hedge request failed: {e}", file=sys.stderr)
+            return
+        if self.backup.cancelled.is_set():
+            breaker.abandon()
+            return
+        breaker.record(True, first_token if first_token is not None else time.monotonic() - started)
+        reply = "".join(parts)
+        with self._lock:
+            if self.winner is not None:
+                return
+            self.winner = "backup"
+            self.reply = reply.strip()
+        with _hedge_lock:
+            _hedge_stats["backup_won"] += 1
+        print(f"[DEBUG] Hedge: {self.backup_model} won after {time.monotonic() - self._started:.1f}s",
+              file=sys.stderr)
+        self.primary.cancel()
+
+    def primary_finished(self) -> bool:
+        """The primary stream ended without error; True if it won the race."""
+        with self._lock:
+            if self.winner is None and not self.primary.cancelled.is_set():
+                self.winner = "primary"
+            self.first_token.set()  # a backup that hasn't fired yet never will
+        if self.winner != "primary":
+            return False
+        self.backup.cancel()
+        if self.fired:
+            print(f"[DEBUG] Hedge: primary won after {time.monotonic() - self._started:.1f}s", file=sys.stderr)
+        return True
+
+    def primary_failed(self, then) -> bool:
+        """The primary stream raised.  Returns False if no backup was sent.
+
+        Otherwise then() is called once the backup is done (check `winner`):
+        right away if it already is, else on the backup's thread, so the
+        caller doesn't hold a scheduler worker while it waits.
+        """
+        with self._lock:
+            self.first_token.set()  # a backup that hasn't fired yet never will
+            if not self.fired:
+                return False
+            if not self._finished:
+                self._then = then
+                return True
+        then()
+        return True
+
+
+def hedge_report() -> str:
+    with _hedge_lock:
+        h = dict(_hedge_stats)
+    return (f"{h['hedged']} hedgeable requests, backup sent for {h['fired']}, backup won {h['backup_won']}, "
+            f"{h['no_slot']} not sent (no free slot)")
+
+
+atexit.register(lambda: print(f"[DEBUG] Hedging: {hedge_report()}", file=sys.stderr))
+
+
+# Hides [reasoning] sections while a reply is still streaming (the final
+# render strips them the same way in render_markdown_message).
+_STREAM_REASONING_RE = re.compile(r'\[reasoning\].*?(?:\[/reasoning\]|$)', re.DOTALL | re.IGNORECASE)
+_STREAM_OPEN_RE = re.compile(r'\[reasoning\]', re.IGNORECASE)
+_STREAM_CLOSE_RE = re.compile(r'\[/reasoning\]', re.IGNORECASE)
+
+
+def _partial_tag(text: str, tag: str) -> int:
+    """Length of the longest tail of text that could be the start of tag."""
+    for k in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text[-k:].lower() == tag[:k]:
+            return k
+    return 0
+
+
+class StreamReasoningFilter:
+    """Incremental version of the reasoning strip for streamed deltas.
+
+    Only the new delta plus a few held-back characters are scanned per call,
+    so a long reply costs O(n) overall instead of re-scanning it every delta.
+    """
+
+    def __init__(self):
+        self.pending = ""          # held back: a possible partial tag
+        self.in_reasoning = False
+
+    def feed(self, delta: str) -> str:
+        """Add a delta and return the newly visible text (may be empty)."""
+        text = self.pending + delta
+        out = []
+        while True:
+            if self.in_reasoning:
+                m = _STREAM_CLOSE_RE.search(text)
+                if m is None:
+                    k = _partial_tag(text, '[/reasoning]')
+                    text = text[len(text) - k:] if k else ""
+                    break
+                text = text[m.end():]
+                self.in_reasoning = False
+            else:
+                m = _STREAM_OPEN_RE.search(text)
+                if m is None:
+                    # Hold back a trailing "[reas..." until we know whether it opens a block
+                    k = _partial_tag(text, '[reasoning]')
+                    out.append(text[:len(text) - k])
+                    text = text[len(text) - k:] if k else ""
+                    break
+                out.append(text[:m.start()])
+                text = text[m.end():]
+                self.in_reasoning = True
+        self.pending = text
+        return "".join(out)
         
 # ----------------------------------------------------------------------
 # --------------------------  USER HOOKS  -------------------------------
@@ -321,20 +1846,46 @@ def on_llm_error(exc: Exception) -> str:
 # GROK_NAME_COLOR = "#2f4e3f"
 
 # ----------------------------------------------------------------------
-# ---------------------  Simple Regex-Based Markdown Renderer ---------
+# ---------------------  Single-Pass Markup Tokenizer -----------------
 # ----------------------------------------------------------------------
+#
+# tokenize_markup() turns a reply into a flat list of (kind, text, arg)
+# tokens in one left-to-right pass over the text.  Token kinds:
+#
+#   "text", "bold", "italic", "code"   inline runs
+#   "link"          text = link text, arg = url
+#   "header"        arg = level (1-4)
+#   "newline"       end of a source line
+#   "code_start", "code_line", "code_end"
+#                   a [code]...[/code] block; code_end's text is the
+#                   spacing that follows the block
+#   "form"          arg = field dicts from parse_form_fields()
+#   "block_end"     end of a text block (before a form and at the end)
+
+_REASONING_PATTERN = r'(?P<reasoning>\[reasoning\].*?\[/reasoning\])'
+_BLOCK_PATTERN = (
+    r'\[form type="collectInfo"\](?P<form>.*?)\[/form\]'
+    r'|(?P<code>\[code\])'
+    r'|(?P<stray_close>\[/code\])'
+)
+_BLOCK_RE = re.compile(_REASONING_PATTERN + "|" + _BLOCK_PATTERN, re.DOTALL | re.IGNORECASE)
+# For messages that keep their [reasoning] text (anything not from Grok)
+_BLOCK_RE_KEEP_REASONING = re.compile(_BLOCK_PATTERN, re.DOTALL | re.IGNORECASE)
+_CODE_END_RE = re.compile(r'\[/code\]', re.IGNORECASE)
+_HEADER_RE = re.compile(r'(#{1,4}) (.*)')
+_INLINE_RE = re.compile(r'(\*\*|__)(.*?)\1|(\*|_)(.*?)\3|`([^`]+)`|\[([^]]+)\]\(([^)]+)\)')
+_FORM_FIELD_RE = re.compile(r'\[(input|select|textarea)(?:\s+([^]]+))?\]')
+_FORM_ATTR_RE = re.compile(r'(\w+)="([^"]*)"')
+
 
-    
 def parse_form_fields(form_text: str) -> list[dict]:
     """Parse [input|select|textarea] tags inside form block into field dicts."""
     fields = []
-    tag_pattern = re.compile(r'\[(input|select|textarea)(?:\s+([^]]+))?\]')
-    for match in tag_pattern.finditer(form_text):
+    for match in _FORM_FIELD_RE.finditer(form_text):
         ftype = match.group(1)
         attrs_str = match.group(2) or ""
         attrs = {}
-        attr_pattern = re.compile(r'(\w+)="([^"]*)"')
-        for attr_match in attr_pattern.finditer(attrs_str):
+        for attr_match in _FORM_ATTR_RE.finditer(attrs_str):
             attrs[attr_match.group(1)] = attr_match.group(2)
         if 'name' not in attrs:
             continue
@@ -349,6 +1900,97 @@ def parse_form_fields(form_text: str) -> list[dict]:
         fields.append(field)
     return fields
 
+
+def tokenize_markup(text: str, strip_reasoning: bool = True) -> list[tuple]:
+    """Tokenize a message's BBCode/markdown markup in a single pass."""
+    tokens = []
+    block_re = _BLOCK_RE if strip_reasoning else _BLOCK_RE_KEEP_REASONING
+    in_block = False  # any text since the last form / start of message?
+    pending = []  # ordinary text waiting to be split into lines
+    pos = 0
+    n = len(text)
+    while pos < n:
+        m = block_re.search(text, pos)
+        pending.append(text[pos:m.start() if m else n])
+        if m is None:
+            break
+        kind = m.lastgroup
+        if kind in ("stray_close", "reasoning"):
+            # An unmatched [/code] or a stripped [reasoning] section: drop it
+            # without breaking the line, as if it had never been in the text
+            pos = m.end()
+            continue
+        segment = "".join(pending)
+        pending = []
+        if segment:
+            _tokenize_lines(segment, tokens)
+            in_block = True
+
+        if kind == "code":
+            # Everything up to [/code] is code, whatever markup it contains
+            close = _CODE_END_RE.search(text, m.end())
+            body = text[m.end():close.start() if close else n].replace("```", "")
+            # Drop the blank remainder of the [code] line and the newline before [/code]
+            first_nl = body.find("\n")
+            if first_nl != -1 and not body[:first_nl].strip():
+                body = body[first_nl + 1:]
+            if body.endswith("\n"):
+                body = body[:-1]
+            tokens.append(("code_start", "", None))
+            for line in body.split("\n") if body else []:
+                tokens.append(("code_line", line, None))
+            tokens.append(("code_end", "\n\n" if close else "\n", None))
+            in_block = True
+            pos = close.end() if close else n
+            if text.startswith("\n", pos):
+                pos += 1  # the [/code] line's own line break
+        elif kind == "form":
+            if in_block:
+                tokens.append(("block_end", "\n", None))
+                in_block = False
+            tokens.append(("form", m.group("form"), parse_form_fields(m.group("form"))))
+            pos = m.end()
+
+    segment = "".join(pending)
+    if segment:
+        _tokenize_lines(segment, tokens)
+        in_block = True
+    if in_block:
+        tokens.append(("block_end", "\n", None))
+    return tokens
+
+
+def _tokenize_lines(segment: str, tokens: list) -> None:
+    """Headers and inline elements for a run of ordinary (non-code) lines."""
+    # Stray triple-backticks are often left unterminated; only [code] makes code blocks
+    segment = segment.replace("```", "")
+    for raw_line in segment.splitlines():
+        header = _HEADER_RE.match(raw_line.strip())
+        if header:
+            tokens.append(("header", header.group(2), len(header.group(1))))
+            continue
+        _tokenize_inline(raw_line, tokens)
+        tokens.append(("newline", "\n", None))
+
+
+def _tokenize_inline(line: str, tokens: list) -> None:
+    """Bold, italic, inline code and links within one line."""
+    pos = 0
+    for match in _INLINE_RE.finditer(line):
+        if match.start() > pos:
+            tokens.append(("text", line[pos:match.start()], None))
+        if match.group(1):  # Bold
+            tokens.append(("bold", match.group(2), None))
+        elif match.group(3):  # Italic
+            tokens.append(("italic", match.group(4), None))
+        elif match.group(5):  # Inline code
+            tokens.append(("code", match.group(5), None))
+        elif match.group(6):  # Link
+            tokens.append(("link", match.group(6), match.group(7)))
+        pos = match.end()
+    if pos < len(line):
+        tokens.append(("text", line[pos:], None))
+
 # ------------------------------------------------------------
 # Move FormFrame here so it's defined before render_markdown_message
 # ------------------------------------------------------------
@@ -451,229 +2093,458 @@ def create_form_frame(widget, fields, bot):
         return fallback
 
 
-def render_markdown_message(widget: scrolledtext.ScrolledText, sender: str, text: str, bot=None) -> None:
+# ----------------------------------------------------------------------
+# ---------------------  Render Ops -----------------------------------
+# ----------------------------------------------------------------------
+#
+# build_render_ops() is pure Python, so replies are parsed in the worker
+# thread.  The UI thread only runs apply_render_ops(), which hands runs of
+# (chars, tags) to Text.insert a few hundred segments at a time.  Ops:
+#
+#   ("text", chars, tags)    tags is a tuple of tag names
+#   ("link", chars, url)
+#   ("form", fields)
+#
+# A [code] block is emitted as a single ("code",) run once its closing
+# [/code] is seen, so it costs one tagged range however long it is.
+
+_MAX_INSERT_RUNS = 500  # (chars, tags) pairs per Text.insert call
+
+
+def build_render_ops(sender: str, text: str) -> list[tuple]:
+    """Parse a message into render ops without touching Tk (safe off the UI thread)."""
+    ops = []
+
+    def add(chars, tags=()):
+        # Merge with the previous run when the tags match
+        if ops and ops[-1][0] == "text" and ops[-1][2] == tags:
+            ops[-1][1].append(chars)
+        else:
+            ops.append(("text", [chars], tags))
+
+    add(f"{sender}: ", ("sender",))
+    code_lines = []
+    # Reasoning is stripped from Grok responses only
+    for kind, value, arg in tokenize_markup(text, strip_reasoning=(sender == "Grok")):
+        if kind == "text":
+            add(value)
+        elif kind in ("bold", "italic", "code"):
+            add(value, (kind,))
+        elif kind == "link":
+            ops.append(("link", value, arg))
+        elif kind == "header":
+            add(value + "\n\n", (f"h{arg}",))
+        elif kind in ("newline", "block_end"):
+            add(value)
+        elif kind == "code_start":
+            add("\n")  # space before block
+            code_lines = []
+        elif kind == "code_line":
+            code_lines.append(value + "\n")
+        elif kind == "code_end":
+            if code_lines:
+                add("".join(code_lines), ("code",))
+            add(value)  # nice spacing after block
+        elif kind == "form":
+            ops.append(("form", arg))
+    add("\n")
+
+    return [("text", "".join(op[1]), op[2]) if op[0] == "text" else op for op in ops]
+
+
+def apply_render_ops(widget: scrolledtext.ScrolledText, ops: list[tuple], bot=None,
+                     index: str = tk.END, forms: bool = True) -> None:
+    """Insert render ops into the widget (UI thread).
+
+    `index` is tk.END or a right-gravity mark, so successive inserts land in
+    order.  With forms=False, forms are rendered as plain text (used when
+    re-rendering old exchanges from the conversation).
+    """
     widget.config(state="normal")
-    widget.insert(tk.END, f"{sender}: ", "sender")
-    
-    # NEW: Strip reasoning if Grok response
-    if sender == "Grok":
-        text = re.sub(r'\[reasoning\].*?\[/reasoning\]', '', text, flags=re.DOTALL | re.IGNORECASE)
-    
-    # Detect form blocks first
-    form_pattern = re.compile(r'\[form type="collectInfo"\](.*?)\[/form\]', re.DOTALL | re.IGNORECASE)
-    pos = 0
+    batch = []
     form_count = 0
-    for match in form_pattern.finditer(text):
-        form_count += 1
-        print(f"[DEBUG] Found form #{form_count} at {match.start()}:{match.end()}", file=sys.stderr)
-        
-        # Insert text before form
-        if match.start() > pos:
-            _process_text_block(widget, text[pos:match.start()])
-        
-        # Parse and embed form
-        form_text = match.group(1)
-        fields = parse_form_fields(form_text)
-        print(f"[DEBUG] Parsed {len(fields)} fields from form_text: {form_text[:100]}...", file=sys.stderr)
+    for op in ops:
+        kind = op[0]
+        if kind == "text":
+            batch.append(op[1])
+            batch.append(op[2])
+            if len(batch) >= 2 * _MAX_INSERT_RUNS:
+                widget.insert(index, *batch)
+                batch = []
+            continue
 
-        form_frame = create_form_frame(widget, fields, bot)
+        # Anything else needs the text so far to be in place
+        if batch:
+            widget.insert(index, *batch)
+            batch = []
+        if kind == "link":
+            _insert_link(widget, op[1], op[2], bot, index)
+        elif kind == "form":
+            form_count += 1
+            if forms:
+                _embed_form(widget, op[1], bot, index)
+            else:
+                widget.insert(index, _form_fallback_text(op[1]))
+    if batch:
+        widget.insert(index, *batch)
+    widget.config(state="disabled")
 
-        start_mark = f"form_start_{id(form_frame)}"
-        widget.mark_set(start_mark, tk.END)
-        widget.insert(tk.END, "\n")
+    print(f"[DEBUG] apply_render_ops complete: {len(ops)} ops, {form_count} forms", file=sys.stderr)
 
-        print("[DEBUG] Attempting window_create...", file=sys.stderr)
-        try:
-            widget.window_create(tk.END, window=form_frame, padx=10, pady=10)
-            widget.insert(tk.END, "\n")
-            print("[DEBUG] window_create succeeded", file=sys.stderr)
-        except Exception as exc:
-            print(f"[DEBUG] window_create FAILED: {exc}", file=sys.stderr)
-            traceback.print_exc()
-            # If window_create fails, print and render a plaintext fallback
-            print("Failed to embed form widget in text widget:", exc, file=sys.stderr)
-            traceback.print_exc()
-            for f in fields:
-                lbl = f.get("label", f.get("name", ""))
-                val = f.get("value", "")
-                widget.insert(tk.END, f"{lbl}: {val}\n")
-            widget.insert(tk.END, "\n")
-            pos = match.end()
-            continue
 
-        end_mark = f"form_end_{id(form_frame)}"
-        widget.mark_set(end_mark, tk.END)
-        
-        # Track form with start/end marks (so indices remain valid as content changes)
-        if bot is not None and hasattr(bot, "forms"):
-            try:
-                # Some fallback frames won't include submit_btn or fields, but we still track the widget
-                bot.forms.append((start_mark, end_mark, form_frame, {f['name']: f for f in fields}))
-            except Exception as e:
-                print("Failed to append form record to bot.forms:", e, file=sys.stderr)
-                traceback.print_exc()
-        # attach bot reference if frame supports it
-        try:
-            form_frame.bot = bot
-        except Exception:
-            pass
-        
-        pos = match.end()
-    
-    # Remaining text
-    if pos < len(text):
-        _process_text_block(widget, text[pos:])
-    
-    widget.insert(tk.END, "\n")
-    widget.config(state="disabled")
+def render_ops_text(ops: list[tuple]) -> str:
+    """The plain text apply_render_ops(..., forms=False) inserts for `ops`."""
+    parts = []
+    for op in ops:
+        if op[0] in ("text", "link"):
+            parts.append(op[1])
+        elif op[0] == "form":
+            parts.append(_form_fallback_text(op[1]))
+    return "".join(parts)
 
-    print(f"[DEBUG] render_markdown_message complete: processed {form_count} forms", file=sys.stderr)
-
-def _process_text_block(widget, text_block):
-    """Process non-form text block (existing markdown logic)."""
-    # Prefer explicit [code]...[/code] markers for code blocks.
-    # Convert any case-variant of [code] and [/code] to temporary tokens,
-    # strip all existing triple-backtick markers (which are often left
-    # unterminated and cause rendering problems), then restore our
-    # canonical fences so the downstream parser treats only the
-    # [code]...[/code] regions as code blocks.
-    START_TOKEN = "___CUSTOM_CODE_START___"
-    END_TOKEN = "___CUSTOM_CODE_END___"
-    # make [code] handling case-insensitive
-    text_block = re.sub(r"\[code\]", START_TOKEN, text_block, flags=re.IGNORECASE)
-    text_block = re.sub(r"\[/code\]", END_TOKEN, text_block, flags=re.IGNORECASE)
-    # remove any stray triple-backticks to avoid accidental unclosed blocks
-    text_block = text_block.replace("```", "")
-    # restore our canonical fences for only the [code] blocks
-    text_block = text_block.replace(START_TOKEN, "```").replace(END_TOKEN, "```")
-    
-    lines = text_block.splitlines()
-    i = 0
-    in_code_block = False
-    code_block_start = None
-
-    while i < len(lines):
-        raw_line = lines[i]
-        line = raw_line.strip()
-
-        if in_code_block:
-            # Check for end of code block
-            if line.startswith("```") or line == "```":
-                _apply_code_tags(widget, code_block_start)
-                in_code_block = False
-                code_block_start = None
-                widget.insert(tk.END, "\n\n")  # nice spacing after block
-                i += 1
-                continue
 
-            # Inside code block — insert the raw line and tag it
-            start = widget.index(tk.END)
-            widget.insert(tk.END, raw_line + "\n")
-            widget.tag_add("code", start, widget.index(tk.END))
-            i += 1
-            continue
+def render_markdown_message(widget: scrolledtext.ScrolledText, sender: str, text: str, bot=None) -> None:
+    apply_render_ops(widget, build_render_ops(sender, text), bot)
 
-        # Start of code block
-        if line.startswith("```") or line == "```":
-            in_code_block = True
-            code_block_start = widget.index(tk.END)
-            widget.insert(tk.END, "\n")  # space before block
-            i += 1
-            continue
-            
-        # Headers (handle first)
-        if _handle_header(widget, line, i, lines):
-            i += 1
-            continue
+def _form_fallback_text(fields) -> str:
+    """Plain-text stand-in for a form that is not embedded as a widget."""
+    lines = [f"{f.get('label', f.get('name', ''))}: {f.get('value', '')}\n" for f in fields]
+    return "".join(lines) + "\n"
 
-        # Process inline elements: bold, italic, code, links
-        _process_inline_elements(widget, raw_line)
-        widget.insert(tk.END, "\n")
-        i += 1
+def _embed_form(widget, fields, bot, index=tk.END):
+    """Embed a FormFrame for `fields` at `index` and track it on the bot."""
+    print(f"[DEBUG] Parsed {len(fields)} fields from form", file=sys.stderr)
 
-    # If ended in code block (unclosed), apply tag anyway
-    if in_code_block and code_block_start:
-        _apply_code_tags(widget, code_block_start)
-        widget.insert(tk.END, "\n")
+    form_frame = create_form_frame(widget, fields, bot)
 
-    widget.insert(tk.END, "\n")
-    # Remove: widget.config(state="disabled")
-    # widget.see(tk.END)  # remove to allow custom scrolling
+    start_mark = f"form_start_{id(form_frame)}"
+    widget.mark_set(start_mark, _insert_point(index))
+    widget.mark_gravity(start_mark, "left")
+    widget.insert(index, "\n")
 
-def _apply_code_tags(widget, code_block_start):
-    """Apply code tags to the entire code block."""
-    if code_block_start is not None:
-        current = code_block_start
-        while True:
-            next_line = widget.index(f"{current} lineend + 1c")
-            if widget.compare(next_line, ">", widget.index(tk.END + "-2c")):  # last line
-                widget.tag_add("code", current, tk.END)
-                break
-            widget.tag_add("code", current, next_line)
-            current = next_line
-
-def _handle_header(widget, line, i, lines):
-    """Handle header lines and return True if processed."""
-    if line.startswith("### "):
-        content = line[4:]
-        widget.insert(tk.END, content + "\n\n", "h3")
-        return True
-    elif line.startswith("#### "):
-        content = line[3:]
-        widget.insert(tk.END, content + "\n\n", "h4")
-        return True
-    elif line.startswith("## "):
-        content = line[3:]
-        widget.insert(tk.END, content + "\n\n", "h2")
-        return True
-    elif line.startswith("# "):
-        content = line[2:]
-        widget.insert(tk.END, content + "\n\n", "h1")
-        return True
-    return False
+    print("[DEBUG] Attempting window_create...", file=sys.stderr)
+    try:
+        widget.window_create(index, window=form_frame, padx=10, pady=10)
+        widget.insert(index, "\n")
+        print("[DEBUG] window_create succeeded", file=sys.stderr)
+    except Exception as exc:
+        print(f"[DEBUG] window_create FAILED: {exc}", file=sys.stderr)
+        traceback.print_exc()
+        # If window_create fails, render a plaintext fallback
+        widget.insert(index, _form_fallback_text(fields))
+        return
 
-def _process_inline_elements(widget, raw_line):
-    """Process inline markdown elements in a line."""
-    pos = 0
-    inline_patterns = re.compile(r'(\*\*|__)(.*?)\1|(\*|_)(.*?)\3|`([^`]+)`|\[([^]]+)\]\(([^)]+)\)')
+    end_mark = f"form_end_{id(form_frame)}"
+    widget.mark_set(end_mark, _insert_point(index))
+    widget.mark_gravity(end_mark, "left")  # later text goes after the form, not inside it
 
-    for match in inline_patterns.finditer(raw_line):
-        # Insert text before match
-        if match.start() > pos:
-            widget.insert(tk.END, raw_line[pos:match.start()])
+    # Track form with start/end marks (so indices remain valid as content changes)
+    if bot is not None and hasattr(bot, "forms"):
+        try:
+            # Some fallback frames won't include submit_btn or fields, but we still track the widget
+            bot.forms.append((start_mark, end_mark, form_frame, {f['name']: f for f in fields}))
+        except Exception as e:
+            print("Failed to append form record to bot.forms:", e, file=sys.stderr)
+            traceback.print_exc()
+    # attach bot reference if frame supports it
+    try:
+        form_frame.bot = bot
+    except Exception:
+        pass
+
+def _insert_point(index):
+    """Where text inserted at `index` actually goes (tk.END inserts before the final newline)."""
+    return "end-1c" if index == tk.END else index
+
+def _insert_link(widget, link_text, url, bot=None, index=tk.END):
+    """Insert link text under the shared "link" tag; the bot records where its URL starts."""
+    start = widget.index(_insert_point(index))
+    widget.insert(index, link_text, ("link",))
+    if bot is not None and hasattr(bot, "register_link"):
+        bot.register_link(start, url)
+
+def _fold(text: str) -> str:
+    """Lower-case `text` without changing its length, so offsets into it still line up."""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class FindIndex:
+    """Case-insensitive index over the messages rendered in one chat window (Ctrl+F).
+
+    Each entry is one rendered message: the mark where it starts in
+    chat_display, its text as Tk counts it (embedded forms are one character)
+    and a sort key in document order.  A trigram -> entries map narrows a
+    query to the messages that can contain it, so the find bar never rescans
+    the Text widget.  Entries of exchanges collapsed into the scrollback keep
+    their text but lose their mark (`hide`); re-rendering the exchange
+    replaces them.
+    """
 
-        # Handle matched inline
-        if match.group(1):  # Bold
-            content = match.group(2)
-            start = widget.index(tk.END)
-            widget.insert(tk.END, content)
-            widget.tag_add("bold", start, widget.index(tk.END))
-        elif match.group(3):  # Italic
-            content = match.group(4)
-            start = widget.index(tk.END)
-            widget.insert(tk.END, content)
-            widget.tag_add("italic", start, widget.index(tk.END))
-        elif match.group(5):  # Inline code
-            content = match.group(5)
-            start = widget.index(tk.END)
-            widget.insert(tk.END, content)
-            widget.tag_add("code", start, widget.index(tk.END))
-        elif match.group(6):  # Link
-            link_text = match.group(6)
-            url = match.group(7)
-            start = widget.index(tk.END)
-            widget.insert(tk.END, link_text)
-            end = widget.index(tk.END)
-            tag_name = f"link_{start}"
-            widget.tag_config(tag_name, foreground="#58f5ab", underline=True)
-            widget.tag_add(tag_name, start, end)
-            widget.tag_bind(tag_name, "<Button-1>", lambda e, u=url: webbrowser.open(u))
+    def __init__(self):
+        self.entries: Dict[int, dict] = {}
+        self.version = 0  # bumped on every change; the find bar re-runs its query when it moves
+        self._grams = collections.defaultdict(set)
+        self._by_mark: Dict[str, int] = {}
+        self._by_group = collections.defaultdict(set)  # exchange mark -> entry ids
+        self._seq = 0
+
+    def next_mark(self) -> str:
+        return f"find_{self._seq}"
+
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, mark: str | None, text: str, key: int, group: str | None = None, ex: dict | None = None,
+            long_mark: str | None = None) -> int:
+        """Index one message; `mark` is next_mark(), or None for a message that is not rendered."""
+        entry_id = self._seq
+        self._seq += 1
+        folded = _fold(text)
+        self.entries[entry_id] = {
+            "mark": mark, "text": folded, "key": (key, entry_id), "group": group, "ex": ex,
+            "long": long_mark, "astral": any(c > "\uffff" for c in folded),
+        }
+        for gram in self._trigrams(folded):
+            self._grams[gram].add(entry_id)
+        if mark is not None:
+            self._by_mark[mark] = entry_id
+        if group is not None:
+            self._by_group[group].add(entry_id)
+        self.version += 1
+        return entry_id
+
+    def remove(self, entry_id: int) -> None:
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for gram in self._trigrams(entry["text"]):
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._grams[gram]
+        if entry["mark"] is not None:
+            self._by_mark.pop(entry["mark"], None)
+        if entry["group"] is not None:
+            self._by_group[entry["group"]].discard(entry_id)
+        self.version += 1
+
+    def hide(self, mark: str) -> None:
+        """The message's text left the widget (scrollback collapse); keep it searchable."""
+        entry_id = self._by_mark.pop(mark, None)
+        if entry_id is not None:
+            self.entries[entry_id]["mark"] = None
+            self.version += 1
+
+    def group(self, group: str) -> List[int]:
+        return sorted(self._by_group.get(group, ()))
+
+    def marks(self) -> List[str]:
+        return list(self._by_mark)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self._grams.clear()
+        self._by_mark.clear()
+        self._by_group.clear()
+        self.version += 1
+
+    def find(self, query: str) -> List[tuple]:
+        """(entry_id, offset) of every match of `query`, in document order."""
+        q = _fold(query)
+        if not q:
+            return []
+        if len(q) >= 3:
+            sets = sorted((self._grams.get(gram, set()) for gram in self._trigrams(q)), key=len)
+            candidates = sets[0].intersection(*sets[1:])
+        else:
+            candidates = self.entries.keys()
+        # Sort the messages, not the matches: a short query can match every few characters
+        hits = []
+        for entry_id in sorted(candidates, key=lambda e: self.entries[e]["key"]):
+            text = self.entries[entry_id]["text"]
+            i = text.find(q)
+            while i >= 0:
+                hits.append((entry_id, i))
+                i = text.find(q, i + len(q))
+        return hits
+
+    def index_of(self, entry_id: int, offset: int) -> str | None:
+        """Text-widget index of a match, or None while its message is collapsed."""
+        entry = self.entries.get(entry_id)
+        if entry is None or entry["mark"] is None:
+            return None
+        if entry["astral"]:
+            # Tk counts a character outside the BMP as two
+            offset += sum(1 for c in entry["text"][:offset] if c > "\uffff")
+        return f"{entry['mark']} + {offset} chars"
+
+
+class ExchangeIndex:
+    """The exchanges of one chat window, in order, each tied to its text in chat_display.
+
+    An entry is a dict: "seq" (the number in its mark names), "mark" and
+    "end" (marks around its text; unset while it is collapsed into the
+    scrollback), "mode" (the label shown with the question) and "meta" (the
+    reply's model, latency and usage).  Its slice of the conversation is
+    read with conv()/stop(): removing an exchange moves every later one up,
+    so the index keeps those shifts in a Fenwick tree over append order
+    instead of rewriting the later entries.  Entries are found by position,
+    start mark or conversation index without scanning the session.
+    """
 
-        pos = match.end()
+    def __init__(self):
+        self._items: List[dict] = []
+        self._by_mark: Dict[str, dict] = {}
+        self._shifts = [0]  # Fenwick tree, 1-based by "slot": how far entries moved up
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, i):
+        return self._items[i]
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def _shift(self, slot: int) -> int:
+        total = 0
+        while slot > 0:
+            total += self._shifts[slot]
+            slot -= slot & -slot
+        return total
+
+    def append(self, seq: int, conv: int, mode: str | None, stop: int | None = None) -> dict:
+        slot = len(self._shifts)
+        # The new node covers earlier slots too; a new entry itself has not moved
+        self._shifts.append(self._shift(slot - 1) - self._shift(slot - (slot & -slot)))
+        offset = self._shift(slot)
+        mark = f"exchange_{seq}"
+        ex = {"seq": seq, "mark": mark, "end": f"{mark}_end", "slot": slot, "conv_base": conv - offset,
+              "stop_base": (conv if stop is None else stop) - offset, "mode": mode, "meta": {}}
+        self._items.append(ex)
+        self._by_mark[mark] = ex
+        return ex
+
+    def conv(self, ex: dict) -> int:
+        """Conversation index of the exchange's first message."""
+        return ex["conv_base"] + self._shift(ex["slot"])
+
+    def stop(self, ex: dict) -> int:
+        """Conversation index just past the exchange's last message."""
+        return ex["stop_base"] + self._shift(ex["slot"])
+
+    def set_stop(self, ex: dict, stop: int) -> None:
+        ex["stop_base"] = stop - self._shift(ex["slot"])
+
+    def by_mark(self, mark: str) -> dict | None:
+        return self._by_mark.get(mark)
+
+    def position(self, ex: dict) -> int:
+        return bisect.bisect_left(self._items, ex["seq"], key=lambda e: e["seq"])
+
+    def at_turn(self, conv_index: int) -> int:
+        """Position of the exchange holding conversation message `conv_index` (-1 if none)."""
+        return bisect.bisect_right(self._items, conv_index, key=self.conv) - 1
+
+    def remove(self, pos: int) -> dict:
+        """Drop an exchange whose messages were deleted; later ones move up in the conversation."""
+        ex = self._items.pop(pos)
+        del self._by_mark[ex["mark"]]
+        removed = self.stop(ex) - self.conv(ex)
+        slot = ex["slot"] + 1  # every slot after this one, O(log n)
+        while slot < len(self._shifts):
+            self._shifts[slot] -= removed
+            slot += slot & -slot
+        return ex
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._by_mark.clear()
+        self._shifts = [0]
+
+
+class SessionSearchWindow(Toplevel):
+    """Search every stored session (SessionStore.search) and open a hit in its window."""
+
+    def __init__(self, bot):
+        super().__init__(bot.root)
+        self.bot = bot
+        self._after_id = None
+        self.title("Search All Sessions")
+        self.geometry("640x560")
+        self.configure(bg=WINDOW_BG_COLOR)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(2, weight=1)
+
+        self.query_var = tk.StringVar()
+        entry = ttkb.Entry(self, textvariable=self.query_var, font=(FONT_FAMILY, 11))
+        entry.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 4))
+        entry.focus_set()
+        self.query_var.trace_add("write", lambda *_: self._schedule_search())
+        entry.bind("<Return>", lambda e: (self._search() or "break"))
+        self.bind("<Escape>", lambda e: self.destroy())
+
+        self.status = tk.Label(self, text="Type to search past sessions.", anchor="w",
+                               bg=WINDOW_BG_COLOR, fg="#6c757d")
+        self.status.grid(row=1, column=0, sticky="ew", padx=12)
+
+        self.results = scrolledtext.ScrolledText(self, wrap=tk.WORD, font=(FONT_FAMILY, 12),
+                                                 bg=CHAT_BG, fg=CHAT_FG, cursor="arrow")
+        self.results.grid(row=2, column=0, sticky="nsew", padx=10, pady=(4, 10))
+        self.results.tag_configure("hit_title", font=(FONT_FAMILY, 12, "bold"), foreground=SENDER_COLOR)
+        self.results.tag_configure("hit_meta", foreground="#6c757d")
+        self.results.tag_configure("hit_match", background="#fff3b0")
+        self.results.config(state="disabled")
+
+    def _schedule_search(self) -> None:
+        # Search once typing pauses rather than on every keystroke
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        self._after_id = self.after(150, self._search)
+
+    def _search(self) -> None:
+        self._after_id = None
+        query = self.query_var.get().strip()
+        t0 = time.perf_counter()
+        try:
+            hits = session_store.search(query) if query else []
+        except sqlite3.Error as e:
+            self.status.config(text=f"Search failed: {e}")
+            return
+        elapsed = (time.perf_counter() - t0) * 1000
+        self.status.config(text=f"{len(hits)} result(s) in {elapsed:.1f} ms" if query else "")
+
+        widget = self.results
+        widget.config(state="normal")
+        widget.delete("1.0", tk.END)
+        for tag in widget.tag_names():
+            if tag.startswith("hit_") and tag[4:].isdigit():
+                widget.tag_delete(tag)
+        for i, hit in enumerate(hits):
+            tag = f"hit_{i}"
+            when = datetime.datetime.fromtimestamp(hit["created"]).strftime("%Y-%m-%d %H:%M") if hit["created"] else ""
+            speaker = "You" if hit["role"] == "user" else "Grok"
+            widget.insert(tk.END, (hit["title"] or "Untitled session") + "\n", ("hit_title", tag),
+                          f"{when} \u00b7 {speaker}\n", ("hit_meta", tag))
+            # The snippet marks matches with SEARCH_MARK_START / SEARCH_MARK_END
+            snippet = hit["snippet"].replace("\n", " ")
+            for j, piece in enumerate(re.split(f"[{SEARCH_MARK_START}{SEARCH_MARK_END}]", snippet)):
+                widget.insert(tk.END, piece, ("hit_match", tag) if j % 2 else (tag,))
+            widget.insert(tk.END, "\n\n")
+            widget.tag_bind(tag, "<Button-1>",
+                            lambda e, h=hit: self.bot.manager.open_stored_session(h["session_id"], h["seq"]))
+            widget.tag_bind(tag, "<Enter>", lambda e: self.results.config(cursor="hand2"))
+            widget.tag_bind(tag, "<Leave>", lambda e: self.results.config(cursor="arrow"))
+        widget.config(state="disabled")
 
-    # Insert remaining text
-    if pos < len(raw_line):
-        widget.insert(tk.END, raw_line[pos:])
 
 class SessionManager:
     def __init__(self):
@@ -778,8 +2649,82 @@ class SessionManager:
         self.sessions.append(bot)
         return bot
 
+    def restore_sessions(self) -> list:
+        """Offer to reopen the windows a crash left journals for; returns the restored bots."""
+        if session_journal is None:
+            return []
+        leftovers = session_journal.leftovers()
+        if not leftovers:
+            return []
+        temp_root = tk.Tk()
+        temp_root.withdraw()
+        label = "window" if len(leftovers) == 1 else "windows"
+        try:
+            answer = messagebox.askyesno(
+                "Restore Sessions",
+                f"{len(leftovers)} chat {label} from the last run were not closed.\n\nRestore them?",
+                parent=temp_root)
+        finally:
+            temp_root.destroy()
+        if not answer:
+            for session_id in leftovers:
+                session_journal.discard(session_id)
+            return []
+        restored = []
+        for session_id in leftovers:
+            t0 = time.perf_counter()
+            try:
+                conversation, exchanges = session_journal.load(session_id)
+            except OSError as e:
+                print(f"[DEBUG] Could not read journal {session_id}: {e}", file=sys.stderr)
+                continue
+            if not conversation:
+                session_journal.discard(session_id)
+                continue
+            bot = self.create_session()
+            bot.restore_conversation(session_id, conversation, exchanges)
+            print(f"[DEBUG] Restored session {session_id}: {len(conversation)} turns in "
+                  f"{(time.perf_counter() - t0) * 1000:.0f} ms", file=sys.stderr)
+            restored.append(bot)
+        return restored
+
+    def open_stored_session(self, session_id: str, seq: int):
+        """Show a stored session scrolled to the exchange holding turn `seq`.
+
+        A window already showing the session is reused; otherwise a new one is
+        opened and carries on the stored session.
+        """
+        bot = next((b for b in self.sessions if b.session_id == session_id), None)
+        if bot is None:
+            rows = session_store.load_turns(session_id)
+            if not rows:
+                return None
+            conversation = []
+            for row in rows:
+                msg = {"role": row["role"], "content": row["content"]}
+                if row["long"]:
+                    msg["long"] = row["long"]
+                conversation.append(msg)
+            # Imported exports have no labels; they show as plain questions
+            exchanges = [(i, row["label"]) for i, row in enumerate(rows) if row["role"] == "user"]
+            seq = next((i for i, row in enumerate(rows) if row["seq"] == seq), len(rows) - 1)
+            bot = self.create_session()
+            bot.restore_conversation(session_id, conversation, exchanges,
+                                     note=f"Opened a stored session ({len(exchanges)} exchanges).", journal=True)
+        bot.show_turn(seq)
+        try:
+            bot.root.deiconify()
+            bot.root.lift()
+            bot.root.focus_force()
+        except Exception:
+            pass
+        return bot
+
     def close_session(self, bot):
         """Close and unregister the given session. If none remain, quit the app."""
+        # A window closed on purpose needs no crash journal
+        if session_journal is not None and getattr(bot, "session_id", None):
+            session_journal.discard(bot.session_id)
         # Let the bot perform a graceful shutdown (cancels after callbacks, etc.)
         try:
             if hasattr(bot, "close"):
@@ -811,7 +2756,8 @@ class GrokChatBot:
         # manager will register us in create_session, avoid double-add here
         # Running flag and after-id for safe cancellation on close
         self._running = True
-        self._after_id = None
+        self._after_id = None  # only used when falling back to polling the queue
+        self._wake_r = self._wake_w = None  # self-pipe that wakes the Tk loop
         #        self.root.title("Grok Chatbot (Powered by xAI & Python LLM Library)")
         #        self.root.geometry(f"{INITIAL_WINDOW_WIDTH}x{INITIAL_WINDOW_HEIGHT}")
         self.root.configure(bg=WINDOW_BG_COLOR)
@@ -831,13 +2777,51 @@ class GrokChatBot:
             "Ask Questions": "\n\nAsk 2-3 questions to clarify the user's intent. Do not provide full answers yet.",
             "Collect Info.": "\n\nCollect information by asking about specifications and requirements. List key details needed.",
         }
+        # Generation settings per mode (optional "stop" list too).  Short modes get
+        # tight limits so a runaway reply can't take long; the output lengths seen
+        # per mode are printed at exit (mode_output_report) to tune these.
+        self.mode_profiles = {
+            "Short": {"max_tokens": 200, "temperature": 0.4},
+            "QA": {"max_tokens": 900, "temperature": 0.5},
+            "Medium": {"max_tokens": 2048, "temperature": 0.5},
+            "Long": {"max_tokens": 4096, "temperature": 0.6},
+            "Ask Questions": {"max_tokens": 600, "temperature": 0.5},
+            "Collect Info.": {"max_tokens": 900, "temperature": 0.4},
+        }
         self.cogitate_var = tk.BooleanVar(value=False)
+        self.cache_var = tk.BooleanVar(value=RESPONSE_CACHE_ENABLED)  # View > Use Response Cache
+        self.hedge_var = tk.BooleanVar(value=HEDGE_ENABLED)  # View > Hedge Slow Replies
+
+        # One entry per exchange: its marks in chat_display, its slice of
+        # self.conversation and the reply's metadata (see ExchangeIndex)
+        self.exchanges = ExchangeIndex()
+        self._exchange_seq = 0
+        self._first_rendered = 0  # exchanges before this index are collapsed
+        self._load_older_pending = False
+        self.budget = ContextBudgeter()  # which part of self.conversation is sent
+        self._compaction: RequestHandle | None = None  # background summary job, if running
+        # Long answers of progressive sends: {"handle", "parent", "conv", "mark", "body", "result"}
+        self._long_sections: List[dict] = []
+        self._long_marks: Dict[str, dict] = {}  # header mark -> {"body": tag, "open": bool}
+        self._long_seq = 0
+        # Find bar (Ctrl+F): what is rendered is indexed as it is rendered
+        self.find_index = FindIndex()
+        self._find_unindexed: List[dict] = []  # exchanges a restore left collapsed, indexed on first find
+        self._find_open = False
+        self._find_query = ""
+        self._find_version = -1
+        self._find_hits: List[tuple] = []   # (entry_id, offset) in document order
+        self._find_shown: List[int] = []    # positions in _find_hits of the rendered matches
+        self._find_pos = -1                 # current match, -1 for none
+        self._find_after = None
+        self._find_highlight_pending = False
         # ------------------------------------------------------------------------------
 
         self._setup_menubar()
         self._setup_buttons()
         self._setup_chat_display()
         self._setup_input_area()
+        self._setup_find_bar()
         self.buttons_visible = True
         self._setup_tags()
         self._setup_bindings()
@@ -845,7 +2829,11 @@ class GrokChatBot:
         # Threading & welcome (unchanged)
         self.response_queue = queue.Queue()
         self.conversation: List[Dict[str, str]] = []
-        self.check_queue()
+        self.session_id = uuid.uuid4().hex  # key of this conversation in session_store
+        self._streaming = False  # True while a reply is being streamed into chat_display
+        self._stream_parts: List[str] = []  # visible text streamed so far
+        self._active_request: RequestHandle | None = None
+        self._setup_wakeup()
 
         self.add_to_chat(
             "Grok",
@@ -867,6 +2855,7 @@ class GrokChatBot:
 
         # NEW: form state tracking
         self.forms = []  # list of (start_mark, end_mark, form_frame, fields_dict)
+        self.search_window = None  # File > Search All Sessions
         self.active_form = None
 
         # NEW: first submission tracking
@@ -876,6 +2865,8 @@ class GrokChatBot:
         """Gracefully stop periodic callbacks and destroy the window."""
         # Prevent further rescheduling
         self._running = False
+        self._cancel_compaction()
+        self._teardown_wakeup()
         # Cancel scheduled after callback if present
         try:
             if self._after_id is not None:
@@ -965,7 +2956,15 @@ class GrokChatBot:
             highlightthickness=0,
         )
         self.chat_display.grid(row=1, column=0, padx=10, pady=(5, 0), sticky="nsew")
-        self._setup_context_menu(self.chat_display)
+        self.chat_menu = self._setup_context_menu(self.chat_display, on_popup=self._on_chat_menu)
+        self._menu_exchange = None  # exchange under the last right-click
+        self.chat_menu.add_separator()
+        self.chat_menu.add_command(label="Copy This Exchange",
+                                   command=lambda: self.copy_exchange(self._menu_exchange))
+        self.chat_menu.add_command(label="Re-render This Exchange",
+                                   command=lambda: self.rerender_exchange(self._menu_exchange))
+        self.chat_menu.add_command(label="Delete This Exchange",
+                                   command=lambda: self.delete_exchange(self._menu_exchange))
         # NEW: bind resize event for forms
         self.chat_display.bind("<Configure>", self._resize_forms)
 
@@ -981,6 +2980,45 @@ class GrokChatBot:
         self.chat_display.tag_config("sender", font=SENDER_FONT, foreground=SENDER_COLOR)
         self.chat_display.tag_config("form", foreground="blue", font=BOLD_FONT)
 
+        # All links share one tag and one binding; link_urls maps each link's
+        # start mark to its URL (see register_link / _on_link_click)
+        self.link_urls: Dict[str, str] = {}
+        self._link_seq = 0
+        self.chat_display.tag_config("link", foreground="#58f5ab", underline=True)
+        self.chat_display.tag_bind("link", "<Button-1>", self._on_link_click)
+
+        # Placeholder line for collapsed exchanges; scrolling to the top loads them too
+        self.chat_display.tag_config("scrollback", foreground="#6c757d", font=ITALIC_FONT, justify="center")
+        self.chat_display.tag_bind("scrollback", "<Button-1>", self._load_older_exchanges)
+        self.chat_display.configure(yscrollcommand=self._on_chat_yscroll)
+
+        # Header line of a progressive send's long answer; clicking it shows/hides the body
+        self.chat_display.tag_config("long_toggle", foreground=HEADER_COLOR, font=ITALIC_FONT)
+        self.chat_display.tag_bind("long_toggle", "<Button-1>", self._on_long_toggle)
+
+    def register_link(self, index: str, url: str) -> None:
+        """Remember the URL of a link whose text starts at `index`."""
+        mark = f"link_{self._link_seq}"
+        self._link_seq += 1
+        self.chat_display.mark_set(mark, index)
+        self.chat_display.mark_gravity(mark, "left")  # stay at the start of the link text
+        self.link_urls[mark] = url
+
+    def _on_link_click(self, event):
+        """Open the URL of the link under the mouse."""
+        widget = self.chat_display
+        clicked = widget.index(f"@{event.x},{event.y}")
+        link_range = widget.tag_prevrange("link", f"{clicked} + 1c")
+        if not link_range:
+            return
+        # Nearest link mark at or before the click (adjacent links share one tag range)
+        mark = widget.mark_previous(f"{clicked} + 1c")
+        while mark and mark not in self.link_urls:
+            mark = widget.mark_previous(mark)
+        if mark and widget.compare(mark, ">=", link_range[0]):
+            webbrowser.open(self.link_urls[mark])
+        return "break"
+
     def _setup_tags(self):
         """Placeholder for additional tag configurations if needed."""
         pass  # Tags are now configured in _setup_chat_display
@@ -992,6 +3030,9 @@ class GrokChatBot:
         self.root.bind("<Control-k>", self.copy_last_exchange)
         self.root.bind("<Control-Shift-K>", self.copy_entire_session)
         self.root.bind("<Control-e>", self.export_session)
+        self.root.bind("<Control-Shift-F>", self.open_search)
+        self.root.bind("<Control-f>", self.open_find_bar)
+        self.root.bind("<Control-j>", self.go_to_exchange)
         self.root.bind("<Control-BackSpace>", self.clear_conversation)
 
         # Add Quit (Ctrl+Q) binding
@@ -1011,6 +3052,11 @@ class GrokChatBot:
         self.root.bind_all("<Control-Key-4>", lambda e: (self._invoke_mode_button("Ask Questions") or "break"))
         self.root.bind_all("<Control-5>", lambda e: (self._invoke_mode_button("Collect Info.") or "break"))
         self.root.bind_all("<Control-Key-5>", lambda e: (self._invoke_mode_button("Collect Info.") or "break"))
+        self.root.bind_all("<Control-6>", lambda e: (self._invoke_mode_button("Progressive") or "break"))
+        self.root.bind_all("<Control-Key-6>", lambda e: (self._invoke_mode_button("Progressive") or "break"))
+
+        # Cancel the in-flight request, like Ctrl+. in the web client
+        self.root.bind_all("<Control-period>", self.cancel_request)
 
         # Cogitate toggle
         self.root.bind("<Control-g>", lambda e: (self.cogitate_var.set(not self.cogitate_var.get()), "break")[1])
@@ -1023,20 +3069,34 @@ class GrokChatBot:
         self.root.bind_all("<Control-Shift-S>", self.submit_active_form)
         self.chat_display.bind("<FocusIn>", lambda e: setattr(self, 'active_form', None))
 
-    def add_to_chat(self, sender: str, message: str, mode: str | None = None) -> None:
-        """Add a message to the chat display with markdown rendering."""
-        display_message = message
-        if sender == "You" and mode is not None:
-            MAX_CHARS = 160
-            if len(message) > MAX_CHARS:
-                truncated = message[:MAX_CHARS].rstrip()
-                last_space = truncated.rfind(" ")
-                if last_space > 0:
-                    truncated = truncated[:last_space].rstrip()
-                display_message = truncated + "..." + f" [{mode}]"
-            else:
-                display_message = message + f" [{mode}]"
-        render_markdown_message(self.chat_display, sender, display_message, self)
+    def add_to_chat(self, sender: str, message: str, mode: str | None = None, ops: list | None = None) -> None:
+        """Add a message to the chat display with markdown rendering.
+
+        `ops` are render ops already built from `message` (e.g. in a worker thread).
+        """
+        start = self.chat_display.index("end-1c")
+        if ops is not None:
+            apply_render_ops(self.chat_display, ops, self)
+        else:
+            display_message = message
+            if sender == "You":
+                display_message = self._format_user_message(message, mode)
+            render_markdown_message(self.chat_display, sender, display_message, self)
+        self._index_message(start, "end-1c", self.exchanges[-1] if self.exchanges else None)
+
+    @staticmethod
+    def _format_user_message(message: str, mode: str | None) -> str:
+        """Truncate a user message for display and append its [mode] label."""
+        if mode is None:
+            return message
+        MAX_CHARS = 160
+        if len(message) > MAX_CHARS:
+            truncated = message[:MAX_CHARS].rstrip()
+            last_space = truncated.rfind(" ")
+            if last_space > 0:
+                truncated = truncated[:last_space].rstrip()
+            return truncated + "..." + f" [{mode}]"
+        return message + f" [{mode}]"
 
     def _setup_input_area(self):
         """Setup the input frame, entry, and send button."""
@@ -1056,6 +3116,10 @@ class GrokChatBot:
             # ignore if the style backend doesn't accept those options
             pass
         self.entry.bind("<Return>", lambda e: self.send_with_mode("QA") or "break")
+        # Shift+Return sends without looking in the response cache (still stores the new reply)
+        self.entry.bind("<Shift-Return>", lambda e: self.send_with_mode("QA", bypass_cache=True) or "break")
+        # Typing after an idle gap re-opens a pooled connection before the question is sent
+        self.entry.bind("<Key>", lambda e: client_manager.warm_if_idle())
         self.entry.focus_set()
         self._setup_context_menu(self.entry)
 
@@ -1071,6 +3135,10 @@ class GrokChatBot:
         except Exception:
             pass
 
+        # Retry/queue status under the progress bar, only gridded while there is something to say
+        self.status_label = tk.Label(self.input_frame, text="", anchor="w", bg=WINDOW_BG_COLOR,
+                                     fg="#6c757d", font=(FONT_FAMILY, 9))
+
         # Modes frame underneath
         self.modes_frame = tk.Frame(self.input_frame, relief="flat", bg=WINDOW_BG_COLOR)
         self.modes_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
@@ -1106,6 +3174,9 @@ class GrokChatBot:
         create_mode_button("Ask Questions", "Ask Questions", "Ctrl+4", 1, 0, MODE_STYLE)  # Swapped position with Medium
         create_mode_button("Collect Info.", "Collect Info.", "Ctrl+5", 1, 1, MODE_STYLE)   # Swapped position with Long
 
+        # Row 2: Short answer now, Long answer attached when it arrives
+        create_mode_button("Short → Long", "Progressive", "Ctrl+6", 2, 0, "submitByLength")
+
         # Cogitate checkbox
         ttkb.Checkbutton(
             self.modes_frame,
@@ -1114,30 +3185,155 @@ class GrokChatBot:
             bootstyle="secondary"
         ).grid(row=1, column=2, sticky="w", padx=2, pady=2)
 
-    def _send_request(self, user_input: str, addition: str, user_mode_display: str | None, model: str) -> None:
-        """Common logic to send user input: add to chat/conversation, start progress, launch worker."""
-        # Prepend AVOIDANCE_FOR_SESSION to first submission in session
-       # if self.first_submission:
-        addition = AVOIDANCE_FOR_SESSION + "\n" + addition
-         #   self.first_submission = False
+    def _send_request(self, user_input: str, addition: str, user_mode_display: str | None, model: str,
+                      mode: str = "QA", cogitate: bool = False, bypass_cache: bool = False,
+                      long_addition: str | None = None) -> None:
+        """Common logic to send user input: add to chat/conversation, start progress, launch worker.
 
-        self.last_user_start = self.chat_display.index(tk.END)
+        With `long_addition`, a Long-mode request for the same question runs alongside.
+        """
+        # AVOIDANCE_FOR_SESSION now lives in SYSTEM_PREFIX, ahead of the history
+        self.last_user_start = self._begin_exchange(user_mode_display)
         self.add_to_chat("You", user_input, mode=user_mode_display)
-        self.conversation.append({"role": "user", "content": user_input})
+        self._append_message("user", user_input, mode=mode)
         self.entry.delete(0, tk.END)
         self.chat_display.see(tk.END)
         # Switch to progress bar
         self.entry.grid_remove()
         self.progress.grid(row=0, column=0, sticky="ew", padx=(0, 10))
         self.progress.start()
-        self.send_btn.configure(state="disabled")
-        threading.Thread(target=lambda: self._worker(addition, model), daemon=True).start()
+        self._start_worker(addition, model, mode, cogitate, bypass_cache)
+        if long_addition is not None:
+            self._start_long(long_addition, model, cogitate)
+
+    def _generation_profile(self, mode: str, cogitate: bool) -> Dict:
+        profile = dict(self.mode_profiles.get(mode, self.mode_profiles["QA"]))
+        if cogitate:
+            profile["max_tokens"] += COGITATE_EXTRA_TOKENS
+        return profile
+
+    def _start_worker(self, addition: str, model: str, mode: str = "QA", cogitate: bool = False,
+                      bypass_cache: bool = False) -> None:
+        """Launch the worker for the current conversation; Send becomes Stop until it finishes."""
+        handle = RequestHandle()
+        self._active_request = handle
+        self._stream_parts = []
+        self.send_btn.configure(text="Stop (Ctrl+.)", command=self.cancel_request, bootstyle="danger")
+        profile = self._generation_profile(mode, cogitate)
+        # None = don't use the cache; "store" = skip the lookup but keep the new reply
+        cache = None
+        if self.cache_var.get():
+            cache = "store" if bypass_cache else "use"
+        hedge = self.hedge_var.get() and mode in HEDGE_MODES and model in HEDGE_MODELS
+        try:
+            # Taken here: the worker must not read self.conversation or the budgeter while
+            # the UI deletes an exchange, applies a compaction or clears the session
+            window = self.budget.window(self.conversation, addition, model)
+        except Exception as e:
+            self._post_response(("error", on_llm_error(e), handle))
+            return
+        ahead = scheduler.submit(
+            self, lambda: self._worker(addition, model, handle, window, mode, profile, cache, hedge), handle)
+        if ahead:
+            print(f"[DEBUG] Request queued behind {ahead} other request(s)", file=sys.stderr)
+            self._show_status(f"Waiting for {ahead} other request(s) to finish…")
+
+    def _append_message(self, role: str, content: str, **meta) -> Dict[str, str]:
+        """Add a turn to self.conversation and queue it for the session store and journal."""
+        msg = {"role": role, "content": content}
+        self.conversation.append(msg)
+        seq = len(self.conversation) - 1
+        starts = False
+        if self.exchanges:
+            ex = self.exchanges[-1]  # later messages belong to the latest exchange
+            self.exchanges.set_stop(ex, seq + 1)
+            starts = self.exchanges.conv(ex) == seq
+            if role == "assistant":
+                ex["meta"] = meta
+        if session_store is not None:
+            # The exchange's label ("Cogitate", "Ask Questions", ...) goes with the turn that starts it
+            session_store.append_turn(self.session_id, seq, role, content,
+                                      dict(meta, label=self.exchanges[-1]["mode"]) if starts else meta)
+        if session_journal is not None:
+            record = {"t": "turn", "seq": seq, "role": role, "content": content}
+            if starts:
+                record["exchange"] = self.exchanges[-1]["mode"]
+            session_journal.append(self.session_id, record)
+        return msg
+
+    def _start_long(self, addition: str, model: str, cogitate: bool) -> None:
+        """Request the Long answer for the exchange whose Short request was just started."""
+        parent = self._active_request
+        handle = parent.child()  # cancelling the Short request while both run stops both
+        # Taken now, so the Short reply does not end up in this history
+        history, _ = self.budget.window(self.conversation, addition, model)
+        profile = self._generation_profile("Long", cogitate)
+        self._long_sections.append({"handle": handle, "parent": parent, "conv": len(self.conversation) - 1,
+                                    "mark": None, "body": None, "result": None})
+
+        def job():
+            try:
+                reply = "".join(generate_response_stream(history, addition, model, handle, None, profile)).strip()
+                if handle.cancelled.is_set():
+                    return
+                self._post_response(("long", (reply, build_render_ops("Grok", reply)[1:]), handle))
+            except Exception as e:
+                if not handle.cancelled.is_set():
+                    self._post_response(("long", on_llm_error(e), handle))
+
+        scheduler.submit(self, job, handle)
+
+    def _finish_request(self) -> None:
+        """Swap the progress bar back for the entry and restore the Send button."""
+        self._active_request = None
+        self._stream_parts = []
+        self._show_status(None)
+        self.progress.stop()
+        self.progress.grid_remove()
+        self.entry.grid(row=0, column=0, sticky="ew", padx=(0, 10))
+        self.entry.focus_set()
+        self.send_btn.configure(text="Send", command=lambda: self.send_with_mode("QA"),
+                                bootstyle="primary", state="normal")
+
+    def _show_status(self, text: str | None) -> None:
+        """Show (or with None, hide) a one-line status under the progress bar."""
+        if text:
+            self.status_label.configure(text=text)
+            self.status_label.grid(row=2, column=0, columnspan=2, sticky="ew")
+        else:
+            self.status_label.grid_remove()
+
+    def cancel_request(self, event=None):
+        """Abort the in-flight request (Ctrl+.), keeping whatever was already streamed."""
+        handle = self._active_request
+        if handle is None:
+            self._cancel_long_sections()
+            return "break"
+        handle.cancel()
+        self._drop_long_sections(handle)
+        partial = "".join(self._stream_parts).strip()
+        print(f"[DEBUG] Request cancelled after {len(partial)} chars", file=sys.stderr)
+        self._discard_stream_preview()
+        if partial:
+            self._append_message("assistant", partial, cancelled=True)
+            self.add_to_chat("Grok", partial + "\n\n*[cancelled]*")
+        else:
+            self.add_to_chat("Grok", "*Request cancelled.*")
+        self._trim_scrollback()
+        self.chat_display.see(tk.END)
+        self._finish_request()
+        return "break"
 
-    def send_with_mode(self, mode: str, event=None) -> None:
+    def send_with_mode(self, mode: str, event=None, bypass_cache: bool = False) -> None:
         user_input = self.entry.get().strip()
         if not user_input:
             return
 
+        # "Progressive" sends a Short request now and a Long one alongside it
+        progressive = mode == "Progressive" and not self.in_ask_questions_mode
+        if mode == "Progressive":
+            mode = "Short" if progressive else "QA"
+
         special_addition = None
         effective_mode = mode
         user_mode_display = effective_mode if effective_mode != "QA" else None
@@ -1181,6 +3377,11 @@ Always end your response with exactly: "(Type '...' and I'll proceed with info.
                 """.strip()
                 addition += first_instruction + "\n\n" + cont_instruction
 
+        long_addition = None
+        if progressive:
+            long_addition = "\n\nMODE: Long\n\n" + self.mode_instructions.get("Long", "")
+            user_mode_display = "Short → Long"
+
         model_to_use = GROK_MODEL_REASONING if self.cogitate_var.get() else GROK_MODEL
         print(f"[DEBUG] Sending with mode '{effective_mode}', cogitate={self.cogitate_var.get()}, model={model_to_use}", file=sys.stderr)
         
@@ -1200,6 +3401,8 @@ Then provide your response according to the MODE instructions.
 The [reasoning] section will not be shown to the user.
         """.strip()
             addition = cogitate_instruction + "\n\n" + addition
+            if long_addition is not None:
+                long_addition = cogitate_instruction + "\n\n" + long_addition
             
             cogi_tag = "Cogitate"
             if user_mode_display is not None:
@@ -1207,24 +3410,406 @@ The [reasoning] section will not be shown to the user.
             else:
                 user_mode_display = cogi_tag
     
-        self._send_request(user_input, addition, user_mode_display, model_to_use)
+        self._send_request(user_input, addition, user_mode_display, model_to_use,
+                           mode=effective_mode, cogitate=self.cogitate_var.get(), bypass_cache=bypass_cache,
+                           long_addition=long_addition)
 
     # ------------------------------------------------------------------
-    def _worker(self, addition: str, model: str) -> None:
-        """Runs in a background thread – calls the hook."""
+    def _worker(self, addition: str, model: str, handle: RequestHandle, window: Tuple[list, int],
+                mode: str = "QA", profile: Dict | None = None, cache: str | None = None,
+                hedge: bool = False) -> None:
+        """Runs in a background thread – streams the reply into the queue as deltas.
+
+        `window` is the (history, estimate) pair the UI thread took from the
+        budgeter when the request was started.  Queue items are (type, payload,
+        handle); check_queue drops them once the handle has been cancelled.
+        """
+        history, estimate = window
+        raw_parts = []
+        visible = StreamReasoningFilter()
+
+        def on_retry(attempt, delay, exc):
+            reason = getattr(exc, "status_code", None) or "connection error"
+            self._post_response(("status", f"Retrying ({reason}) in {delay:.0f}s — attempt "
+                                           f"{attempt + 1} of {RETRY_MAX_ATTEMPTS}", handle))
+
+        cache_key = None
+        if cache:
+            # Keyed on what would be sent to the requested model
+            cache_key = response_cache_key(history, addition, model, profile)
+            cached = response_cache.get(cache_key) if cache == "use" else None
+            if cached is not None:
+                print(f"[DEBUG] Response cache hit {cache_key[:12]}", file=sys.stderr)
+                ops = build_render_ops("Grok", cached)
+                ops.insert(1, ("text", "[cached reply — Shift+Enter to ask again]\n", ("italic",)))
+                self._post_response(("success", (cached, ops, {"mode": mode, "model": "cache"}), handle))
+                return
+
+        try:
+            model, note = choose_model(model)
+        except CircuitOpenError as e:
+            self._post_response(("error", on_llm_error(e), handle))
+            return
+        if note:
+            self._post_response(("status", note, handle))
+        breaker = breaker_for(model)
+        started = time.monotonic()
+        first_token = None
+        hedged = None
+        stream_handle = handle
+        if hedge and not note:
+            hedged = HedgedRequest(
+                handle, HEDGE_MODELS[model], history, addition, profile,
+                on_fire=lambda: self._post_response(
+                    ("status", f"{model} is slow to start — also asking {HEDGE_MODELS[model]}", handle)))
+            stream_handle = hedged.primary
+            hedged.start()
+
+        def post_reply(model: str, note: str | None, reply_handle: RequestHandle, reply: str) -> None:
+            """Render the finished reply and post it (on the backup's thread if the primary failed)."""
+            if reply_handle.usage is not None:
+                calibrate_tokens(model, estimate, reply_handle.usage.prompt_tokens)
+            bot_reply = reply.strip()
+            truncated = reply_handle.finish_reason == "length"
+            if profile:
+                used = (reply_handle.usage.completion_tokens if reply_handle.usage is not None
+                        else estimate_tokens({"content": bot_reply}))
+                record_mode_output(mode, used, profile["max_tokens"], truncated)
+            # Parse here so the UI thread only has to insert the result
+            ops = build_render_ops("Grok", bot_reply)
+            if note:
+                ops.insert(1, ("text", f"[{note}]\n", ("italic",)))
+            if truncated:
+                ops.append(("text", f"[reply reached the {mode} mode length limit]\n", ("italic",)))
+            elif cache_key and not note and bot_reply:
+                response_cache.put(cache_key, bot_reply, model)
+            meta = {"mode": mode, "model": model, "latency": time.monotonic() - started,
+                    "first_token": first_token, "usage": reply_handle.usage}
+            self._post_response(("success", (bot_reply, ops, meta), handle))
+
+        def after_backup(error: Exception) -> None:
+            """The primary failed: post the backup's reply, or the primary's error if it has none."""
+            if handle.cancelled.is_set():
+                return
+            try:
+                if hedged.winner == "backup":
+                    post_reply(hedged.backup_model, f"answered by {hedged.backup_model} — {model} failed",
+                               hedged.backup, hedged.reply)
+                else:
+                    self._post_response(("error", on_llm_error(error), handle))
+            except Exception as e:
+                self._post_response(("error", on_llm_error(e), handle))
+
+        try:
+            for delta in generate_response_stream(history, addition, model, stream_handle, on_retry, profile):
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                    if hedged is not None:
+                        hedged.first_token.set()
+                raw_parts.append(delta)
+                new_text = visible.feed(delta)
+                if new_text:
+                    self._post_response(("delta", new_text, handle))
+        except Exception as e:
+            if handle.cancelled.is_set():
+                # Closing the stream mid-read raises; the UI already moved on
+                breaker.abandon()
+                return
+            if hedged is None or not hedged.primary.cancelled.is_set():
+                # Only provider trouble counts against the model, not e.g. a bad key
+                if _is_retryable(e):
+                    breaker.record(False)
+                else:
+                    breaker.abandon()
+                if hedged is None or not hedged.primary_failed(lambda error=e: after_backup(error)):
+                    self._post_response(("error", on_llm_error(e), handle))
+                return  # with a backup out, its thread posts the outcome; this worker is free
+            # Otherwise the winning backup closed the primary's stream (below)
+        if handle.cancelled.is_set():
+            breaker.abandon()
+            return
         try:
-            bot_reply = generate_response_raw(self.conversation, addition, model)
-            self.conversation.append({"role": "assistant", "content": bot_reply})
-            self.response_queue.put(("success", bot_reply))
+            if hedged is not None and not hedged.primary_finished():
+                # Lost the race: still counts as a (slow) call against the primary's breaker
+                breaker.record(True, time.monotonic() - started)
+                post_reply(hedged.backup_model, f"answered by {hedged.backup_model} — {model} was slower",
+                           hedged.backup, hedged.reply)
+            else:
+                breaker.record(True, first_token if first_token is not None else time.monotonic() - started)
+                post_reply(model, note, stream_handle, "".join(raw_parts))
         except Exception as e:
-            self.response_queue.put(("error", on_llm_error(e)))
+            self._post_response(("error", on_llm_error(e), handle))
+
+    # ------------------------------------------------------------------
+    # Progressive send: the Short reply renders as usual and the Long answer is
+    # attached under it as a collapsed section ("▸ Long answer") once it arrives.
+    def _place_long_section(self, parent: RequestHandle) -> None:
+        """After the Short reply is rendered, put the Long answer's header line under it."""
+        for sec in self._long_sections:
+            if sec["parent"] is parent and sec["mark"] is None:
+                break
+        else:
+            return
+        widget = self.chat_display
+        sec["mark"] = f"long_{self._long_seq}"
+        sec["body"] = f"long_body_{self._long_seq}"
+        self._long_seq += 1
+        widget.config(state="normal")
+        widget.mark_set(sec["mark"], "end-1c")
+        widget.mark_gravity(sec["mark"], "left")
+        widget.insert("end-1c", "▸ Long answer: generating…\n", ("long_toggle",))
+        widget.config(state="disabled")
+        widget.tag_config(sec["body"], elide=True)
+        if sec["result"] is not None:
+            self._fill_long_section(sec)
+
+    def _on_long_result(self, payload, handle: RequestHandle) -> None:
+        sec = next((s for s in self._long_sections if s["handle"] is handle), None)
+        if sec is None:
+            return
+        if handle.cancelled.is_set():
+            self._long_sections.remove(sec)
+            return
+        sec["result"] = payload
+        if sec["mark"] is not None:
+            self._fill_long_section(sec)
+        # otherwise the Short reply is still coming; _place_long_section fills it in
+
+    def _fill_long_section(self, sec: dict) -> None:
+        """Replace the "generating…" header with the collapsed Long answer."""
+        if sec in self._long_sections:
+            self._long_sections.remove(sec)
+        widget = self.chat_display
+        mark = sec["mark"]
+        if not isinstance(sec["result"], str):
+            msg_index = sec["conv"] + 1
+            if msg_index < len(self.conversation) and self.conversation[msg_index]["role"] == "assistant":
+                msg = self.conversation[msg_index]
+                msg["long"] = sec["result"][0]
+                msg.pop("_tokens", None)  # estimate now covers the long text
+                if session_store is not None:
+                    session_store.set_long(self.session_id, msg_index, msg["long"])
+                if session_journal is not None:
+                    session_journal.append(self.session_id, {"t": "long", "seq": msg_index, "text": msg["long"]})
+        try:
+            widget.index(mark)
+        except tk.TclError:
+            return  # the exchange was collapsed into the scrollback meanwhile
+        # Only the header line's text is replaced and the body goes in before its
+        # newline, so marks of later exchanges (left gravity) stay after it.
+        widget.config(state="normal")
+        widget.delete(mark, f"{mark} lineend")
+        if isinstance(sec["result"], str):
+            label = "cancelled" if sec["result"] == "cancelled" else f"failed: {sec['result']}"
+            widget.insert(mark, f"▸ Long answer {label}", ("long_toggle",))
+            widget.mark_unset(mark)
+            widget.config(state="disabled")
+            return
+        reply, ops = sec["result"]
+        if ops and ops[-1][0] == "text" and ops[-1][1].endswith("\n"):
+            ops = ops[:-1] + [("text", ops[-1][1][:-1], ops[-1][2])]
+        widget.insert(mark, "▸ Long answer (click to expand)", ("long_toggle",))
+        widget.mark_set("long_insert", f"{mark} lineend")
+        widget.mark_gravity("long_insert", "right")
+        body_start = widget.index("long_insert")
+        apply_render_ops(widget, [("text", "\n", ())] + ops, self, index="long_insert")
+        widget.config(state="normal")
+        widget.tag_add(sec["body"], body_start, "long_insert")
+        pos = self.exchanges.at_turn(sec["conv"])
+        self._index_message(body_start, "long_insert", self.exchanges[pos] if pos >= 0 else None, long_mark=mark)
+        widget.mark_unset("long_insert")
+        widget.config(state="disabled")
+        self._long_marks[mark] = {"body": sec["body"], "open": False}
+
+    def _on_long_toggle(self, event):
+        """Show or hide the Long answer whose header was clicked."""
+        widget = self.chat_display
+        clicked = widget.index(f"@{event.x},{event.y}")
+        mark = widget.mark_previous(f"{clicked} + 1c")
+        while mark and mark not in self._long_marks:
+            mark = widget.mark_previous(mark)
+        if not mark or widget.compare(mark, "<", f"{clicked} linestart"):
+            return "break"
+        self._set_long_open(mark, not self._long_marks[mark]["open"])
+        return "break"
+
+    def _set_long_open(self, mark: str, is_open: bool) -> None:
+        section = self._long_marks[mark]
+        if section["open"] == is_open:
+            return
+        section["open"] = is_open
+        widget = self.chat_display
+        widget.tag_config(section["body"], elide=not is_open)
+        widget.config(state="normal")
+        widget.delete(mark, f"{mark} + 1c")
+        widget.insert(mark, "▾" if is_open else "▸", ("long_toggle",))
+        widget.config(state="disabled")
+
+    def _drop_long_sections(self, parent: RequestHandle) -> None:
+        """Forget Long answers whose Short request was cancelled or failed before placing them."""
+        self._long_sections = [sec for sec in self._long_sections if sec["parent"] is not parent]
+
+    def _cancel_long_sections(self, render: bool = True) -> None:
+        """Cancel every Long answer still being generated (Ctrl+. with no Short request running)."""
+        pending, self._long_sections = self._long_sections, []
+        for sec in pending:
+            sec["handle"].cancel()
+            if sec["mark"] is None:
+                continue
+            if render:
+                sec["result"] = "cancelled"
+                self._fill_long_section(sec)
+            else:
+                self.chat_display.mark_unset(sec["mark"])
+
+    # ------------------------------------------------------------------
+    # Background compaction: old turns are folded into a rolling summary that
+    # ContextBudgeter sends in their place.  self.conversation itself is left
+    # alone, so the display, exports and scrollback still have every message.
+    def _maybe_compact(self) -> None:
+        """Queue a summary pass (UI thread, between turns) if history has grown past the trigger."""
+        if self._compaction is not None:
+            return
+        block = self.budget.compaction_block(self.conversation)
+        if block is None:
+            return
+        lo, hi = block
+        messages = [dict(role=m["role"], content=message_text(m)) for m in self.conversation[lo:hi]]
+        previous = self.budget.summary["content"] if self.budget.summary else None
+        handle = RequestHandle()
+        self._compaction = handle
+        print(f"[DEBUG] Compacting messages {lo}..{hi - 1} in the background", file=sys.stderr)
+
+        def job():
+            try:
+                text = summarize_history(previous, messages, handle)
+                self._post_response(("summary", (hi, text), handle))
+            except Exception as e:
+                print(f"[DEBUG] Compaction failed: {e}", file=sys.stderr)
+                self._post_response(("summary", None, handle))
+
+        scheduler.submit(self, job, handle, priority=PRIORITY_BACKGROUND)
+
+    def _apply_compaction(self, result, handle: RequestHandle) -> None:
+        if handle is not self._compaction:
+            return
+        self._compaction = None
+        if result is None or handle.cancelled.is_set():
+            return
+        upto, text = result
+        self.budget.set_summary(upto, text)
+        print(f"[DEBUG] History up to message {upto} now sent as a {len(text)}-char summary", file=sys.stderr)
+        # Another pass may already be due in a very long session
+        self._maybe_compact()
+
+    def _cancel_compaction(self) -> None:
+        if self._compaction is not None:
+            self._compaction.cancel()
+            self._compaction = None
 
     # ------------------------------------------------------------------
+    def _setup_wakeup(self) -> None:
+        """Let worker threads wake the Tk loop instead of polling response_queue.
+
+        Every window is its own Tk interpreter but only the first one runs
+        mainloop(), so workers must not call into Tcl themselves.  They write a
+        byte to a pipe instead; the Tcl notifier sees it as a file event.
+        """
+        if hasattr(self.root.tk, "createfilehandler"):
+            try:
+                r, w = os.pipe()
+                os.set_blocking(r, False)
+                os.set_blocking(w, False)
+                self.root.tk.createfilehandler(r, tk.READABLE, self._on_wakeup)
+                self._wake_r, self._wake_w = r, w
+                return
+            except Exception as e:
+                print(f"[DEBUG] Wakeup pipe unavailable ({e}); polling response_queue", file=sys.stderr)
+        # Fallback (e.g. Windows has no Tcl file handlers): poll the queue
+        self._poll_queue()
+
+    def _teardown_wakeup(self) -> None:
+        r, w = self._wake_r, self._wake_w
+        self._wake_r = self._wake_w = None
+        if r is None:
+            return
+        try:
+            self.root.tk.deletefilehandler(r)
+        except Exception:
+            pass
+        for fd in (r, w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _post_response(self, item: tuple) -> None:
+        """Queue an item for the UI thread and wake it.  Safe to call from workers."""
+        self.response_queue.put(item)
+        w = self._wake_w
+        if w is None or not self._running:
+            return
+        try:
+            os.write(w, b"\0")
+        except OSError:
+            # Pipe full (a wakeup is already pending) or window closing
+            pass
+
+    def _on_wakeup(self, fd, mask) -> None:
+        try:
+            while os.read(fd, 4096):
+                pass
+        except OSError:
+            pass
+        self.check_queue()
+
+    def _poll_queue(self) -> None:
+        self.check_queue()
+        # Only reschedule if still running; store the after-id so it can be cancelled on close()
+        if self._running:
+            try:
+                self._after_id = self.root.after(100, self._poll_queue)
+            except Exception:
+                # If scheduling fails (window closing), ensure we don't loop forever
+                self._after_id = None
+
     def check_queue(self) -> None:
+        """Drain response_queue on the UI thread."""
         try:
             while True:
-                typ, msg = self.response_queue.get_nowait()
-                self.add_to_chat("Grok", msg)
+                typ, payload, handle = self.response_queue.get_nowait()
+                if typ == "summary":
+                    self._apply_compaction(payload, handle)
+                    continue
+                if typ == "long":
+                    self._on_long_result(payload, handle)
+                    continue
+                if typ == "notice":
+                    self._flash_message(payload)
+                    continue
+                if handle.cancelled.is_set() or handle is not self._active_request:
+                    continue  # late output from a cancelled request
+                if typ == "delta":
+                    self._show_status(None)
+                    self._append_stream_delta(payload)
+                    continue
+                if typ == "status":
+                    self._show_status(payload)
+                    continue
+
+                # Swap the plain streamed preview for the fully rendered reply
+                self._discard_stream_preview()
+                if typ == "success":
+                    bot_reply, ops, meta = payload
+                    self._append_message("assistant", bot_reply, **meta)
+                    self.add_to_chat("Grok", bot_reply, ops=ops)
+                    self._place_long_section(handle)
+                    self._maybe_compact()
+                else:
+                    self.add_to_chat("Grok", payload)
+                    handle.cancel()  # a pending Long answer has nothing to attach to
+                    self._drop_long_sections(handle)
+                self._trim_scrollback()
 
                 # custom scrolling after adding Grok message
                 if typ == "success" and self.last_user_start is not None:
@@ -1242,24 +3827,502 @@ The [reasoning] section will not be shown to the user.
                     self.chat_display.see(tk.END)
 
                 # Revert to entry after response (success or error)
-                self.progress.stop()
-                self.progress.grid_remove()
-                self.entry.grid(row=0, column=0, sticky="ew", padx=(0, 10))
-                self.entry.focus_set()
-                self.send_btn.configure(state="normal")
+                self._finish_request()
 
         except queue.Empty:
             pass
-        # Only reschedule if still running; store the after-id so it can be cancelled on close()
-        if self._running:
-            try:
-                self._after_id = self.root.after(100, self.check_queue)
-            except Exception:
-                # If scheduling fails (window closing), ensure we don't loop forever
-                self._after_id = None
 
-    def _setup_context_menu(self, widget: tk.Widget) -> None:
-        """Setup right-click context menu for copy/paste/select all."""
+    def _append_stream_delta(self, delta: str) -> None:
+        """Append streamed text to the in-progress Grok message (plain, unrendered)."""
+        widget = self.chat_display
+        widget.config(state="normal")
+        if not self._streaming:
+            # Left gravity keeps the mark in front of everything streamed after it
+            widget.mark_set("stream_start", "end-1c")
+            widget.mark_gravity("stream_start", "left")
+            widget.insert(tk.END, "Grok: ", "sender")
+            self._streaming = True
+            # Put the "You:" line at the top once, then let the reply grow below it
+            if self.last_user_start is not None:
+                self.root.after_idle(self._scroll_to_last_user)
+        widget.insert(tk.END, delta)
+        widget.config(state="disabled")
+        self._stream_parts.append(delta)
+
+    def _discard_stream_preview(self) -> None:
+        """Remove the streamed preview so the final reply can be rendered in its place."""
+        if not self._streaming:
+            return
+        self._streaming = False
+        try:
+            self.chat_display.config(state="normal")
+            self.chat_display.delete("stream_start", "end-1c")
+            self.chat_display.mark_unset("stream_start")
+            self.chat_display.config(state="disabled")
+        except tk.TclError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Virtualized scrollback
+    def _begin_exchange(self, mode_display: str | None) -> str:
+        """Mark where a new exchange starts in chat_display; returns the mark."""
+        widget = self.chat_display
+        if self.exchanges:
+            widget.mark_gravity(self.exchanges[-1]["end"], "left")  # the previous exchange is complete
+        ex = self.exchanges.append(self._exchange_seq, len(self.conversation), mode_display)
+        self._exchange_seq += 1
+        widget.mark_set(ex["mark"], "end-1c")
+        widget.mark_gravity(ex["mark"], "left")
+        # The end mark moves along with whatever the latest exchange still gets (reply, notices)
+        widget.mark_set(ex["end"], "end-1c")
+        widget.mark_gravity(ex["end"], "right")
+        return ex["mark"]
+
+    def _exchange_reply(self, ex: dict) -> str | None:
+        i = self.exchanges.conv(ex) + 1
+        if i < len(self.conversation) and self.conversation[i].get("role") == "assistant":
+            msg = self.conversation[i]
+            if msg.get("long"):
+                return msg.get("content", "") + "\n\n**Long answer:**\n" + msg["long"]
+            return msg.get("content", "")
+        return None
+
+    def restore_conversation(self, session_id: str, conversation: List[Dict], exchanges: list,
+                             note: str | None = None, journal: bool = False) -> None:
+        """Reopen a journaled or stored session under its old id.
+
+        Only the last RESTORE_RENDER_EXCHANGES exchanges are rendered; the rest
+        start out collapsed behind the scrollback placeholder and are rendered
+        a page at a time when scrolled back to, so restoring costs the same
+        however long the session was.  With `journal`, the turns are written to
+        a fresh crash journal (a journaled session already has one).
+        """
+        self.session_id = session_id
+        self.conversation = conversation
+        if journal and session_journal is not None:
+            starts = {conv: mode_display for conv, mode_display in exchanges}
+            for seq, msg in enumerate(conversation):
+                record = {"t": "turn", "seq": seq, "role": msg["role"], "content": msg["content"]}
+                if seq in starts:
+                    record["exchange"] = starts[seq]
+                session_journal.append(session_id, record)
+                if msg.get("long"):
+                    session_journal.append(session_id, {"t": "long", "seq": seq, "text": msg["long"]})
+        widget = self.chat_display
+        hidden = max(0, len(exchanges) - RESTORE_RENDER_EXCHANGES)
+        if hidden:
+            widget.mark_set("scrollback_start", "end-1c")
+            widget.mark_gravity("scrollback_start", "left")
+        for i, (conv, mode_display) in enumerate(exchanges):
+            stop = exchanges[i + 1][0] if i + 1 < len(exchanges) else len(conversation)
+            ex = self.exchanges.append(self._exchange_seq, conv, mode_display, stop)
+            self._exchange_seq += 1
+            if i >= hidden:
+                widget.mark_set(ex["mark"], "end-1c")
+                widget.mark_gravity(ex["mark"], "left")
+                self._render_exchange(ex, tk.END)
+                widget.mark_set(ex["end"], "end-1c")
+                widget.mark_gravity(ex["end"], "left")
+        if self.exchanges:
+            widget.mark_gravity(self.exchanges[-1]["end"], "right")
+        self._first_rendered = hidden
+        self._find_unindexed = self.exchanges[:hidden]
+        widget.config(state="normal")
+        if hidden:
+            self._update_scrollback_placeholder()
+        widget.config(state="disabled")
+        if self.exchanges:
+            self.last_user_start = self.exchanges[-1]["mark"]
+        self.first_submission = False
+        widget.see(tk.END)
+        self._flash_message(note or f"Restored {len(self.exchanges)} exchanges from the last run.")
+
+    def show_turn(self, conv_index: int) -> None:
+        """Scroll to the exchange holding conversation turn `conv_index`, rendering it if collapsed."""
+        pos = self.exchanges.at_turn(conv_index)
+        if pos >= 0:
+            self._show_exchange(pos)
+
+    def _show_exchange(self, pos: int) -> None:
+        while pos < self._first_rendered:
+            self._load_older_exchanges()
+        mark = self.exchanges[pos]["mark"]
+        try:
+            self.chat_display.yview(mark)
+        except tk.TclError:
+            self.chat_display.see(mark)
+
+    def _trim_scrollback(self) -> None:
+        """Collapse the oldest rendered exchanges once too many are on screen."""
+        rendered = len(self.exchanges) - self._first_rendered
+        # Collapse a page at a time rather than one exchange after every reply
+        if rendered <= SCROLLBACK_KEEP_EXCHANGES + SCROLLBACK_PAGE:
+            return
+        widget = self.chat_display
+        keep_from = len(self.exchanges) - SCROLLBACK_KEEP_EXCHANGES
+        start = self.exchanges[self._first_rendered]["mark"]
+        stop = self.exchanges[keep_from]["mark"]
+        if not self._first_rendered:
+            widget.mark_set("scrollback_start", start)
+            widget.mark_gravity("scrollback_start", "left")
+
+        marks = [name for _key, name, _index in widget.dump(start, stop, mark=True)]
+        widget.config(state="normal")
+        widget.delete(start, stop)
+        self._forget_marks(marks)
+        for ex in self.exchanges[self._first_rendered:keep_from]:
+            widget.mark_unset(ex["mark"], ex["end"])
+        self._first_rendered = keep_from
+        self._update_scrollback_placeholder()
+        widget.config(state="disabled")
+        print(f"[DEBUG] Collapsed scrollback: {keep_from} of {len(self.exchanges)} exchanges hidden", file=sys.stderr)
+
+    def _forget_marks(self, marks: list) -> None:
+        """Drop link and form bookkeeping for marks whose text was deleted."""
+        gone = set(marks)
+        for mark in gone:
+            if mark.startswith("find_"):
+                self.find_index.hide(mark)  # still found; the match renders its exchange again
+                self.chat_display.mark_unset(mark)
+        for mark in gone.intersection(self.link_urls):
+            del self.link_urls[mark]
+            self.chat_display.mark_unset(mark)
+        for mark in gone.intersection(self._long_marks):
+            self.chat_display.tag_delete(self._long_marks.pop(mark)["body"])
+            self.chat_display.mark_unset(mark)
+        for sec in self._long_sections:
+            if sec["mark"] in gone:
+                self.chat_display.mark_unset(sec["mark"])  # answer still lands in the conversation
+        remaining = []
+        for rec in self.forms:
+            if rec[0] in gone:
+                try:
+                    rec[2].destroy()
+                except Exception:
+                    pass
+                self.chat_display.mark_unset(rec[0], rec[1])
+            else:
+                remaining.append(rec)
+        self.forms = remaining
+
+    def _update_scrollback_placeholder(self) -> None:
+        """Rewrite the "earlier exchanges" line to match what is collapsed (widget must be editable)."""
+        widget = self.chat_display
+        first = self.exchanges[self._first_rendered]["mark"]
+        widget.delete("scrollback_start", first)
+        hidden = self._first_rendered
+        if not hidden:
+            return
+        label = "exchange" if hidden == 1 else "exchanges"
+        # The first exchange's mark has left gravity; flip it so the line goes in front of it
+        widget.mark_gravity(first, "right")
+        widget.insert("scrollback_start",
+                      f"\u25b2 {hidden} earlier {label} hidden (click or scroll up to show)\n\n",
+                      ("scrollback",))
+        widget.mark_gravity(first, "left")
+
+    def _load_older_exchanges(self, event=None):
+        """Re-render the page of collapsed exchanges just above the rendered ones."""
+        self._load_older_pending = False
+        if not self._first_rendered:
+            return "break"
+        widget = self.chat_display
+        anchor = self.exchanges[self._first_rendered]["mark"]
+        new_first = max(0, self._first_rendered - SCROLLBACK_PAGE)
+        # Right gravity pushes the anchor along as the older text goes in before it
+        widget.mark_gravity(anchor, "right")
+        try:
+            for ex in self.exchanges[new_first:self._first_rendered]:
+                widget.mark_set(ex["mark"], anchor)
+                widget.mark_gravity(ex["mark"], "left")
+                self._render_exchange(ex, anchor)
+                widget.mark_set(ex["end"], anchor)
+                widget.mark_gravity(ex["end"], "left")
+        finally:
+            widget.mark_gravity(anchor, "left")
+        self._first_rendered = new_first
+        widget.config(state="normal")
+        self._update_scrollback_placeholder()
+        widget.config(state="disabled")
+        # Keep what was on top in place instead of jumping to the new text
+        try:
+            widget.yview(anchor)
+        except tk.TclError:
+            widget.see(anchor)
+        return "break"
+
+    def _render_exchange(self, ex: dict, index: str) -> None:
+        """Render one exchange from the conversation at `index` (forms as plain text)."""
+        for entry_id in self.find_index.group(ex["mark"]):
+            self.find_index.remove(entry_id)  # the collapsed copies; indexed again as rendered
+        at = _insert_point(index)
+        for ops in self._exchange_ops(ex):
+            start = self.chat_display.index(at)
+            apply_render_ops(self.chat_display, ops, self, index=index, forms=False)
+            self._index_message(start, at, ex)
+
+    def _exchange_ops(self, ex: dict) -> List[list]:
+        """Render ops of an exchange's question and (if any) reply, rebuilt from the conversation."""
+        question = self.conversation[self.exchanges.conv(ex)]["content"]
+        user_text = self._format_user_message(question, ex["mode"])
+        result = [build_render_ops("You", user_text)]
+        reply = self._exchange_reply(ex)
+        if reply is not None:
+            result.append(build_render_ops("Grok", reply))
+        return result
+
+    def _on_chat_yscroll(self, first, last) -> None:
+        self.chat_display.vbar.set(first, last)
+        # Reaching the top with exchanges collapsed loads the previous page
+        if self._first_rendered and not self._load_older_pending and float(first) <= 0.0:
+            self._load_older_pending = True
+            self.root.after_idle(self._load_older_exchanges)
+        if self._find_shown and not self._find_highlight_pending:
+            self._find_highlight_pending = True
+            self.root.after_idle(self._highlight_visible)
+
+    def _session_text(self) -> str:
+        """The whole session as plain text, including collapsed exchanges."""
+        widget = self.chat_display
+        if not self._first_rendered:
+            return widget.get("1.0", tk.END).strip()
+        hidden = []
+        for ex in self.exchanges[:self._first_rendered]:
+            hidden.append(f"You: {self.conversation[self.exchanges.conv(ex)]['content']}\n\n")
+            reply = self._exchange_reply(ex)
+            if reply is not None:
+                hidden.append(f"Grok: {reply}\n\n")
+        first = self.exchanges[self._first_rendered]["mark"]
+        return (widget.get("1.0", "scrollback_start") + "".join(hidden) + widget.get(first, tk.END)).strip()
+
+    # ------------------------------------------------------------------
+    # Find bar (Ctrl+F).  Matches come from self.find_index, which add_to_chat
+    # and _render_exchange fill as they render; only the matches on screen are
+    # tagged, and again whenever the chat scrolls.
+    def _setup_find_bar(self) -> None:
+        self.find_frame = tk.Frame(self.root, bg=WINDOW_BG_COLOR, bd=1, relief="solid")
+        self.find_var = tk.StringVar()
+        self.find_entry = ttkb.Entry(self.find_frame, textvariable=self.find_var, width=24,
+                                     font=(FONT_FAMILY, 11))
+        self.find_entry.grid(row=0, column=0, padx=(6, 4), pady=4)
+        self.find_status = tk.Label(self.find_frame, text="", width=12, anchor="w", bg=WINDOW_BG_COLOR,
+                                    fg="#6c757d", font=(FONT_FAMILY, 9))
+        self.find_status.grid(row=0, column=1)
+        buttons = (("\u25b2", self.find_previous), ("\u25bc", self.find_next), ("\u2715", self.close_find_bar))
+        for col, (text, command) in enumerate(buttons, start=2):
+            ttkb.Button(self.find_frame, text=text, width=2, bootstyle="secondary",
+                        command=command).grid(row=0, column=col, padx=(0, 4), pady=4)
+        self.find_var.trace_add("write", lambda *_: self._on_find_typed())
+        self.find_entry.bind("<Return>", self.find_next)
+        self.find_entry.bind("<Shift-Return>", self.find_previous)
+        self.find_entry.bind("<Escape>", self.close_find_bar)
+        self.chat_display.tag_config("find_match", background="#fff3b0")
+        self.chat_display.tag_config("find_current", background="#ffb347")
+        self.chat_display.tag_raise("find_current", "find_match")
+
+    def _index_message(self, start: str, end: str, ex: dict | None, long_mark: str | None = None) -> None:
+        """Add what chat_display now holds between `start` and `end` to the find index."""
+        widget = self.chat_display
+        text = "".join(value if key == "text" else "\ufffc"  # an embedded form counts as one character
+                       for key, value, _index in widget.dump(start, end, text=True, window=True, image=True))
+        mark = self.find_index.next_mark()
+        widget.mark_set(mark, start)
+        widget.mark_gravity(mark, "left")
+        self.find_index.add(mark, text, self._find_key(ex), ex["mark"] if ex else None, ex, long_mark)
+        if self._find_open:
+            self._schedule_find()
+
+    @staticmethod
+    def _find_key(ex: dict | None) -> int:
+        """Sort key putting messages in document order: by exchange, greeting first."""
+        return ex["seq"] + 1 if ex else 0
+
+    def _index_collapsed(self) -> None:
+        """Index the exchanges a restore left collapsed (done on first use of the find bar)."""
+        pending, self._find_unindexed = self._find_unindexed, []
+        for ex in pending:
+            if self.find_index.group(ex["mark"]):
+                continue  # rendered (and indexed) since
+            for ops in self._exchange_ops(ex):
+                self.find_index.add(None, render_ops_text(ops), self._find_key(ex), ex["mark"], ex)
+
+    def open_find_bar(self, event=None):
+        """Show the find bar over the top of the chat, with its text selected."""
+        if not self._find_open:
+            self._find_open = True
+            self.find_frame.grid(row=1, column=0, sticky="ne", padx=(0, 40), pady=(10, 0))
+        self.find_entry.focus_set()
+        self.find_entry.select_range(0, tk.END)
+        self._run_find()
+        return "break"
+
+    def close_find_bar(self, event=None):
+        self._find_open = False
+        self.find_frame.grid_remove()
+        self.chat_display.tag_remove("find_match", "1.0", tk.END)
+        self.chat_display.tag_remove("find_current", "1.0", tk.END)
+        self._find_hits, self._find_shown, self._find_pos = [], [], -1
+        self.entry.focus_set()
+        return "break"
+
+    def _on_find_typed(self) -> None:
+        if 0 < len(self.find_var.get()) < FIND_MIN_CHARS:
+            # Left for Enter (_step_find runs any query that differs from the last one)
+            if self._find_after is not None:
+                self.root.after_cancel(self._find_after)
+                self._find_after = None
+            self.chat_display.tag_remove("find_match", "1.0", tk.END)
+            self.chat_display.tag_remove("find_current", "1.0", tk.END)
+            self._find_hits, self._find_shown, self._find_pos = [], [], -1
+            self.find_status.configure(text="Press Enter")
+            return
+        self._schedule_find()
+
+    def _schedule_find(self) -> None:
+        # Coalesce keystrokes and newly rendered messages into one query
+        if self._find_after is None:
+            self._find_after = self.root.after(80, self._run_find)
+
+    def _run_find(self) -> None:
+        """Re-run the query against the index, keeping the current match if it is still there."""
+        if self._find_after is not None:
+            self.root.after_cancel(self._find_after)
+            self._find_after = None
+        if not self._find_open:
+            return
+        self._index_collapsed()
+        current = self._find_hits[self._find_pos] if self._find_pos >= 0 else None
+        self._find_query = self.find_var.get()
+        self._find_version = self.find_index.version
+        self._find_hits = self.find_index.find(self._find_query)
+        self._find_pos = self._find_hits.index(current) if current in self._find_hits else -1
+        # Widget indexes are worked out only for the matches looked at (see _shown_index)
+        entries = self.find_index.entries
+        self._find_shown = [pos for pos, (entry_id, _offset) in enumerate(self._find_hits)
+                            if entries[entry_id]["mark"] is not None]
+        self._mark_current()
+        self._highlight_visible()
+        self._update_find_status()
+
+    def _find_length(self) -> int:
+        """Length of the query in Tk characters."""
+        return sum(2 if c > "\uffff" else 1 for c in self._find_query)
+
+    def _shown_index(self, i: int) -> str:
+        """Widget index of the i-th rendered match."""
+        return self.find_index.index_of(*self._find_hits[self._find_shown[i]])
+
+    def _first_shown_from(self, index: str) -> int:
+        """Position in _find_shown of the first rendered match at or after `index` (binary search)."""
+        lo, hi = 0, len(self._find_shown)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.chat_display.compare(self._shown_index(mid), "<", index):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _highlight_visible(self) -> None:
+        """Tag the matches that are on screen, however many there are elsewhere."""
+        self._find_highlight_pending = False
+        if self._find_open and self._find_version != self.find_index.version:
+            self._run_find()  # messages were collapsed or deleted; their marks are gone
+            return
+        widget = self.chat_display
+        widget.tag_remove("find_match", "1.0", tk.END)
+        if not self._find_shown:
+            return
+        bottom = widget.index(f"@0,{widget.winfo_height()} lineend")
+        length = self._find_length()
+        ranges = []
+        for i in range(self._first_shown_from(widget.index("@0,0")), len(self._find_shown)):
+            index = self._shown_index(i)
+            if widget.compare(index, ">", bottom):
+                break
+            ranges += [index, f"{index} + {length} chars"]
+        if ranges:
+            widget.tag_add("find_match", *ranges)
+
+    def _mark_current(self) -> None:
+        widget = self.chat_display
+        widget.tag_remove("find_current", "1.0", tk.END)
+        if self._find_pos < 0:
+            return
+        index = self.find_index.index_of(*self._find_hits[self._find_pos])
+        if index is not None:
+            widget.tag_add("find_current", index, f"{index} + {self._find_length()} chars")
+
+    def _update_find_status(self) -> None:
+        if not self._find_query:
+            text = ""
+        elif not self._find_hits:
+            text = "No matches"
+        elif self._find_pos < 0:
+            text = f"{len(self._find_hits)} matches"
+        else:
+            text = f"{self._find_pos + 1} of {len(self._find_hits)}"
+        self.find_status.configure(text=text)
+
+    def find_next(self, event=None):
+        """Go to the next match (Enter in the find bar)."""
+        return self._step_find(1)
+
+    def find_previous(self, event=None):
+        """Go to the previous match (Shift+Enter in the find bar)."""
+        return self._step_find(-1)
+
+    def _step_find(self, step: int):
+        if not self._find_open:
+            return self.open_find_bar()
+        if (self._find_after is not None or self._find_version != self.find_index.version
+                or self._find_query != self.find_var.get()):
+            self._run_find()
+        hits = self._find_hits
+        if not hits:
+            return "break"
+        if self._find_pos >= 0:
+            pos = (self._find_pos + step) % len(hits)
+        else:
+            # Nothing selected yet: start from what is on screen
+            i = self._first_shown_from(self.chat_display.index("@0,0"))
+            if step > 0:
+                pos = self._find_shown[i] if i < len(self._find_shown) else 0
+            else:
+                pos = self._find_shown[i - 1] if i > 0 else len(hits) - 1
+        self._goto_find_hit(pos)
+        return "break"
+
+    def _goto_find_hit(self, pos: int) -> None:
+        entry = self.find_index.entries[self._find_hits[pos][0]]
+        if entry["mark"] is None and entry["ex"] is not None:
+            # In a collapsed exchange: render it, then take the same match among its new entries
+            group = entry["group"]
+            nth = sum(1 for hit in self._find_hits[:pos] if self.find_index.entries[hit[0]]["group"] == group)
+            self.show_turn(self.exchanges.conv(entry["ex"]))
+            self._run_find()
+            same = [p for p, hit in enumerate(self._find_hits)
+                    if self.find_index.entries[hit[0]]["group"] == group]
+            if not same:
+                self._update_find_status()
+                return
+            pos = same[min(nth, len(same) - 1)]
+            entry = self.find_index.entries[self._find_hits[pos][0]]
+        self._find_pos = pos
+        if entry["long"] in self._long_marks:
+            self._set_long_open(entry["long"], True)  # the match is in a folded Long answer
+        index = self.find_index.index_of(*self._find_hits[pos])
+        self._mark_current()
+        if index is not None:
+            self.chat_display.see(index)
+        self._highlight_visible()
+        self._update_find_status()
+
+    def _setup_context_menu(self, widget: tk.Widget, on_popup=None) -> Menu:
+        """Setup right-click context menu for copy/paste/select all; returns the menu.
+
+        `on_popup(event)` runs just before the menu is shown.
+        """
         menu = Menu(widget, tearoff=0)
         menu.add_command(label="Cut", command=lambda: widget.event_generate("<<Cut>>"))
         menu.add_command(label="Copy", command=lambda: widget.event_generate("<<Copy>>"))
@@ -1268,38 +4331,27 @@ The [reasoning] section will not be shown to the user.
         menu.add_command(label="Select All", command=lambda: widget.event_generate("<<SelectAll>>"))
 
         def show_context_menu(event):
+            if on_popup is not None:
+                on_popup(event)
             menu.tk_popup(event.x_root, event.y_root)
 
         widget.bind("<ButtonPress-3>", show_context_menu)
         # Bind SelectAll for convenience
         widget.bind("<<SelectAll>>", lambda e: widget.select_range(0, tk.END))
+        return menu
 
     def _scroll_to_last_user(self) -> None:
         """Scroll the chat so the saved `You:` line appears at the top.
 
-        Uses display (wrapped) line counts so wrapped lines are handled
-        correctly. Falls back to `see` on error or when counts are not
-        meaningful (e.g. very small content).
+        `last_user_start` is the exchange's mark, and `yview <index>` puts the
+        display line holding it at the top directly.  Nothing is counted from
+        1.0, so the cost doesn't grow with the length of the transcript.  Near
+        the end of the text Tk clamps the view, as the old fraction did.
         """
         if self.last_user_start is None:
             return
         try:
-            num_display_lines = int(self.chat_display.tk.call(
-                self.chat_display._w, 'count', '-displaylines', '1.0', self.last_user_start
-            ))
-            total_display_lines = int(self.chat_display.tk.call(
-                self.chat_display._w, 'count', '-displaylines', '1.0', 'end-1c'
-            ))
-
-            # If counts are zero or very small, just use `see` to ensure
-            # the target is visible — this is safer on initial responses.
-            if total_display_lines <= 0 or num_display_lines <= 1:
-                self.chat_display.see(self.last_user_start)
-                return
-
-            fraction = (num_display_lines - 1) / max(total_display_lines, 1)
-            fraction = max(0.0, min(1.0, fraction))
-            self.chat_display.yview_moveto(fraction)
+            self.chat_display.yview(self.last_user_start)
         except tk.TclError:
             self.chat_display.see(self.last_user_start)
 
@@ -1318,51 +4370,131 @@ The [reasoning] section will not be shown to the user.
     # NEW: clipboard helpers for keyboard shortcuts
     def copy_last_exchange(self, event=None):
         """Copy the last user -> assistant exchange to the clipboard."""
-        last_user = None
-        last_assistant = None
-
-        # Search conversation from the end for the last user message
-        for i in range(len(self.conversation) - 1, -1, -1):
-            if self.conversation[i].get("role") == "user":
-                last_user = self.conversation[i].get("content", "").strip()
-                # if an assistant reply immediately follows, include it
-                if i + 1 < len(self.conversation) and self.conversation[i + 1].get("role") == "assistant":
-                    last_assistant = self.conversation[i + 1].get("content", "").strip()
-                break
+        if not self.exchanges:
+            self._flash_message("No exchange to copy.")
+            return "break"
+        # stop further handling of the keystroke
+        return self.copy_exchange(len(self.exchanges) - 1, "Last exchange")
+
+    def copy_exchange(self, pos: int, label: str | None = None):
+        """Copy exchange `pos` (0-based) to the clipboard, rebuilt from its conversation slice."""
+        ex = self.exchanges[pos]
+        parts = [f"You: {self.conversation[self.exchanges.conv(ex)].get('content', '').strip()}"]
+        reply = self._exchange_reply(ex)
+        if reply:
+            parts.append(f"Grok: {reply.strip()}")
+        label = label or f"Exchange {pos + 1}"
+        try:
+            self.root.clipboard_clear()
+            self.root.clipboard_append("\n\n".join(parts))
+            self._flash_message(f"{label} copied to clipboard.")
+        except tk.TclError:
+            self._flash_message(f"Failed to copy {label.lower()}.")
+        return "break"
 
-        # Fallback: parse the displayed text if conversation list is empty
-        if last_user is None:
-            display_text = self.chat_display.get("1.0", tk.END).strip()
-            idx = display_text.rfind("You:")
-            if idx != -1:
-                last_user = display_text[idx:].splitlines()[0].replace("You:", "").strip()
-            else:
-                last_user = ""
+    def go_to_exchange(self, event=None):
+        """Ask for an exchange number and scroll to it (Ctrl+J)."""
+        if not self.exchanges:
+            self._flash_message("No exchanges yet.")
+            return "break"
+        n = simpledialog.askinteger("Go to Exchange", f"Exchange number (1-{len(self.exchanges)}):",
+                                    parent=self.root, minvalue=1, maxvalue=len(self.exchanges))
+        if n is not None:
+            self._show_exchange(n - 1)
+        return "break"
 
-        parts = []
-        if last_user:
-            parts.append(f"You: {last_user}")
-        if last_assistant:
-            parts.append(f"Grok: {last_assistant}")
+    def _exchange_at(self, index: str) -> int | None:
+        """Position of the rendered exchange containing `index`.
 
-        result = "\n\n".join(parts).strip()
-        if result:
-            try:
-                self.root.clipboard_clear()
-                self.root.clipboard_append(result)
-                self._flash_message("Last exchange copied to clipboard.")
-            except tk.TclError:
-                self._flash_message("Failed to copy last exchange.")
+        Walks back over the marks of that exchange only (links, find entries)
+        to its start mark.
+        """
+        widget = self.chat_display
+        mark = widget.mark_previous(f"{index} + 1c")
+        while mark and self.exchanges.by_mark(mark) is None:
+            mark = widget.mark_previous(mark)
+        return self.exchanges.position(self.exchanges.by_mark(mark)) if mark else None
+
+    def _exchange_busy(self, pos: int) -> bool:
+        if self._long_sections or (self._active_request is not None and pos == len(self.exchanges) - 1):
+            self._flash_message("Wait for the reply to finish first.")
+            return True
+        return False
+
+    def rerender_exchange(self, pos: int) -> None:
+        """Render exchange `pos` again from the conversation, in place."""
+        if pos < self._first_rendered or self._exchange_busy(pos):
+            return  # collapsed exchanges are rendered from the conversation anyway
+        ex = self.exchanges[pos]
+        widget = self.chat_display
+        widget.config(state="normal")
+        # Keep the last character until the new text is in: marks of the next
+        # exchange sit right after it and must stay after the new text too
+        marks = [name for _key, name, _index in widget.dump(ex["mark"], f"{ex['end']} - 1c", mark=True)]
+        widget.delete(ex["mark"], f"{ex['end']} - 1c")
+        self._forget_marks([m for m in marks if m != ex["mark"]])
+        widget.mark_set("rerender_at", ex["mark"])
+        widget.mark_gravity("rerender_at", "right")
+        self._render_exchange(ex, "rerender_at")
+        widget.config(state="normal")
+        widget.delete("rerender_at")
+        widget.mark_unset("rerender_at")
+        widget.config(state="disabled")
+
+    def delete_exchange(self, pos: int) -> None:
+        """Remove exchange `pos` from the chat, the conversation and the stored session."""
+        if self._exchange_busy(pos):
+            return
+        widget = self.chat_display
+        if pos >= self._first_rendered and self._first_rendered == len(self.exchanges) - 1:
+            self._load_older_exchanges()  # the placeholder needs a rendered exchange under it
+        ex = self.exchanges[pos]
+        collapsed = pos < self._first_rendered
+        widget.config(state="normal")
+        if not collapsed:
+            marks = [name for _key, name, _index in widget.dump(ex["mark"], ex["end"], mark=True)]
+            widget.delete(ex["mark"], ex["end"])
+            self._forget_marks(marks)
+            widget.mark_unset(ex["mark"], ex["end"])
+        for entry_id in self.find_index.group(ex["mark"]):
+            self.find_index.remove(entry_id)
+        if ex in self._find_unindexed:
+            self._find_unindexed.remove(ex)
+
+        lo, hi = self.exchanges.conv(ex), self.exchanges.stop(ex)
+        self.exchanges.remove(pos)
+        if collapsed:
+            self._first_rendered -= 1
+            self._update_scrollback_placeholder()
+        widget.config(state="disabled")
+        del self.conversation[lo:hi]
+        self._cancel_compaction()
+        self.budget.forget(lo, hi)
+        if session_store is not None:
+            session_store.delete_turns(self.session_id, lo, hi - lo)
+        if session_journal is not None:
+            session_journal.append(self.session_id, {"t": "delete", "seq": lo, "count": hi - lo})
+        if self.exchanges:
+            last = self.exchanges[-1]
+            if pos == len(self.exchanges):
+                widget.mark_gravity(last["end"], "right")  # it is the latest exchange again
+            if self.last_user_start == ex["mark"]:
+                self.last_user_start = last["mark"]
         else:
-            self._flash_message("No exchange to copy.")
+            self.last_user_start = None
+        self._flash_message(f"Exchange {pos + 1} deleted.")
 
-        # stop further handling of the keystroke
-        return "break"
+    def _on_chat_menu(self, event) -> None:
+        """Enable the exchange commands of the chat's context menu for the exchange clicked."""
+        self._menu_exchange = self._exchange_at(self.chat_display.index(f"@{event.x},{event.y}"))
+        state = "disabled" if self._menu_exchange is None else "normal"
+        for label in ("Copy This Exchange", "Delete This Exchange", "Re-render This Exchange"):
+            self.chat_menu.entryconfigure(label, state=state)
 
     def copy_entire_session(self, event=None):
         """Copy the entire visible session to the clipboard."""
         try:
-            full = self.chat_display.get("1.0", tk.END).strip()
+            full = self._session_text()
             if full:
                 self.root.clipboard_clear()
                 self.root.clipboard_append(full)
@@ -1376,7 +4508,7 @@ The [reasoning] section will not be shown to the user.
     def export_session(self, event=None):
         """Export the entire session to a timestamped .txt file."""
         try:
-            full_text = self.chat_display.get("1.0", tk.END).strip()
+            full_text = self._session_text()
             if not full_text:
                 self._flash_message("No content to export.")
                 return "break"
@@ -1390,6 +4522,47 @@ The [reasoning] section will not be shown to the user.
             self._flash_message(f"Export failed: {e}")
         return "break"
 
+    def open_search(self, event=None):
+        """Open (or raise) the window for searching every stored session."""
+        if session_store is None:
+            self._flash_message("Search needs the session store (GROK_SESSION_STORE=1).")
+            return "break"
+        win = self.search_window
+        if win is not None and win.winfo_exists():
+            win.lift()
+            win.focus_force()
+        else:
+            session_store.flush()  # include this window's latest turns
+            self.search_window = SessionSearchWindow(self)
+        return "break"
+
+    def import_exports(self, event=None):
+        """Add the chat_session_*.txt exports under a chosen folder to the session store."""
+        if session_store is None:
+            self._flash_message("Importing needs the session store (GROK_SESSION_STORE=1).")
+            return "break"
+        folder = filedialog.askdirectory(parent=self.root, title="Folder with exported sessions")
+        if not folder:
+            return "break"
+        self._flash_message(f"Importing exported sessions from {folder}…")
+
+        def run():
+            files = turns = 0
+            for dirpath, _dirs, names in os.walk(folder):
+                for name in names:
+                    if not (name.startswith("chat_session_") and name.endswith(".txt")):
+                        continue
+                    try:
+                        turns += session_store.import_export(os.path.join(dirpath, name))
+                        files += 1
+                    except (OSError, UnicodeDecodeError) as e:
+                        print(f"[DEBUG] Skipped {name}: {e}", file=sys.stderr)
+            session_store.flush(timeout=None)
+            self._post_response(("notice", f"Imported {turns} messages from {files} exported session(s).", None))
+
+        threading.Thread(target=run, daemon=True).start()
+        return "break"
+
     def new_session(self, event=None):
         """Open a new chat window with a fresh session."""
         # Ask manager to create a new session (it will register and return the bot)
@@ -1411,6 +4584,8 @@ The [reasoning] section will not be shown to the user.
         file_menu.add_command(label="Clear Session (Ctrl+Backspace)", command=self.clear_conversation)
         file_menu.add_separator()
         file_menu.add_command(label="Export Session (Ctrl+E)", command=self.export_session)
+        file_menu.add_command(label="Import Exported Sessions…", command=self.import_exports)
+        file_menu.add_command(label="Search All Sessions (Ctrl+Shift+F)", command=self.open_search)
         file_menu.add_separator()
         file_menu.add_command(label="Quit", command=lambda: self.manager.close_session(self))
 
@@ -1419,17 +4594,58 @@ The [reasoning] section will not be shown to the user.
         menubar.add_cascade(label="Edit", menu=edit_menu)
         edit_menu.add_command(label="Copy Last Exchange (Ctrl+K)", command=self.copy_last_exchange)
         edit_menu.add_command(label="Copy Entire Session (Ctrl+Shift+K)", command=self.copy_entire_session)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Go to Exchange… (Ctrl+J)", command=self.go_to_exchange)
+        edit_menu.add_command(label="Find… (Ctrl+F)", command=self.open_find_bar)
+        edit_menu.add_command(label="Find Next (Enter)", command=self.find_next)
+        edit_menu.add_command(label="Find Previous (Shift+Enter)", command=self.find_previous)
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Cancel Request (Ctrl+.)", command=self.cancel_request)
 
         # View menu
         self.view_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="View", menu=self.view_menu)
         self.view_menu.add_command(label="Hide Button Groups (Ctrl+H)", command=self.toggle_button_groups)
+        self._toggle_buttons_entry = self.view_menu.index("end")  # relabelled by toggle_button_groups
+        self.view_menu.add_checkbutton(label="Use Response Cache (Shift+Enter bypasses)", variable=self.cache_var)
+        self.view_menu.add_checkbutton(label=f"Hedge Slow Replies (ask {GROK_MODEL} after {HEDGE_AFTER:.0f}s)",
+                                       variable=self.hedge_var)
 
     def clear_conversation(self, event=None):
         """Clear the conversation history and chat display."""
+        handle = self._active_request
+        if handle is not None:
+            # Its reply belongs to the old session; check_queue drops it once cancelled
+            handle.cancel()
+            self._streaming = False
+            self._finish_request()
         self.conversation.clear()
+        if session_journal is not None:
+            session_journal.discard(self.session_id)
+        self.session_id = uuid.uuid4().hex  # the cleared conversation stays in the store
+        self._cancel_compaction()
+        self._cancel_long_sections(render=False)
+        self.budget.reset()
         self.chat_display.config(state="normal")
         self.chat_display.delete("1.0", tk.END)
+        self.chat_display.mark_unset("stream_start")
+        for mark in self.link_urls:
+            self.chat_display.mark_unset(mark)
+        self.link_urls.clear()
+        for mark in self._long_marks:
+            self.chat_display.mark_unset(mark)
+        self._long_marks.clear()
+        for ex in self.exchanges[self._first_rendered:]:
+            self.chat_display.mark_unset(ex["mark"], ex["end"])
+        if self._first_rendered:
+            self.chat_display.mark_unset("scrollback_start")
+        for mark in self.find_index.marks():
+            self.chat_display.mark_unset(mark)
+        self.find_index.clear()
+        self._find_unindexed = []
+        self.exchanges.clear()
+        self._first_rendered = 0
+        self.last_user_start = None
         self.chat_display.config(state="disabled")
         self.in_ask_questions_mode = False
         self.ask_questions_first = False
@@ -1606,10 +4822,9 @@ The [reasoning] section will not be shown to the user.
             # Fallback: if _send_request fails, append to conversation and start worker directly
             try:
                 self.add_to_chat("You", summary)
-                self.conversation.append({"role": "user", "content": summary})
-                self.send_btn.configure(state="disabled")
+                self._append_message("user", summary)
                 self.progress.start()
-                threading.Thread(target=lambda: self._worker("", GROK_MODEL), daemon=True).start()
+                self._start_worker("", GROK_MODEL)
             except Exception:
                 pass
 
@@ -1646,18 +4861,20 @@ The [reasoning] section will not be shown to the user.
             self.buttons_frame.grid_remove()
             self.modes_frame.grid_remove()
             self.buttons_visible = False
-            self.view_menu.entryconfig('end', label="Show Button Groups (Ctrl+H)")
+            self.view_menu.entryconfig(self._toggle_buttons_entry, label="Show Button Groups (Ctrl+H)")
         else:
             self.buttons_frame.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="ew")
             self.modes_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=(5, 0))
             self.buttons_visible = True
-            self.view_menu.entryconfig('end', label="Hide Button Groups (Ctrl+H)")
+            self.view_menu.entryconfig(self._toggle_buttons_entry, label="Hide Button Groups (Ctrl+H)")
         return "break" if event is not None else None
 
 # ...existing code...
 
 # Add main entry point at end of file
 if __name__ == "__main__":
+    client_manager.warm_up()  # overlaps TLS setup with building the first window
     manager = SessionManager()
-    first_bot = manager.create_session()
+    restored = manager.restore_sessions()
+    first_bot = restored[0] if restored else manager.create_session()
     first_bot.root.mainloop()
@@ -0,0 +1,268 @@
+# verify_api_client.py
+"""
+Checks chatroomstyle-chatbot-v2.py's API client against a local HTTPS
+stand-in for the xAI chat completions endpoint, without a key or network
+access.  The stand-in's certificate is made with the openssl command; if
+that is missing, the checks run over plain HTTP instead.
+
+    python3 verify_api_client.py
+
+Needs the chatbot's own dependencies installed (it imports the script),
+but no display: no window is opened.  Prints one line per check and exits
+non-zero if any of them fails.
+
+Retries (call_with_retries): Retry-After / retry-after-ms are honoured,
+other 429/5xx wait a jittered backoff, a wait past the deadline gives up
+at once, a 400 is not retried, attempts stop at RETRY_MAX_ATTEMPTS, and a
+cancel ends the wait.
+
+Connection pool (XAIClientManager): warm_up() leaves one open connection,
+later requests reuse it instead of connecting again, concurrent requests
+never open more connections than are in flight, and a stream cancelled
+mid-reply still closes at once.
+"""
+
+import importlib.util
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chatroomstyle-chatbot-v2.py")
+
+
+class StandIn:
+    """What the stand-in server does next; tests change these between checks."""
+    fail_plan = []   # (status, headers) returned, in order, before requests succeed
+    reply = "Hello from the stand-in."
+    chunk_delay = 0.0  # seconds between streamed words
+    requests = 0
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):  # /models, used by the connection warm-up
+        self._send(200, {"object": "list", "data": []})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        StandIn.requests += 1
+        if StandIn.fail_plan:
+            status, headers = StandIn.fail_plan.pop(0)
+            return self._send(status, {"error": {"message": f"injected {status}"}}, headers)
+        model = body.get("model")
+        chunks = [{"id": "x", "object": "chat.completion.chunk", "created": 0, "model": model,
+                   "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+                  for word in StandIn.reply.split(" ")]
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunks.append({"id": "x", "object": "chat.completion.chunk", "created": 0, "model": model,
+                           "choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 5,
+                                                    "total_tokens": 15}})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in [json.dumps(c) for c in chunks] + ["[DONE]"]:
+                data = f"data: {chunk}\n\n".encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                if StandIn.chunk_delay:
+                    self.wfile.flush()
+                    time.sleep(StandIn.chunk_delay)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, ssl.SSLError):
+            pass  # the client hung up mid-reply
+
+
+def start_stand_in():
+    """Serve StandInHandler over HTTPS if openssl can make a certificate; returns (server, url, verify)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    cert_dir = tempfile.mkdtemp(prefix="grok_verify_cert_")
+    cert, key = os.path.join(cert_dir, "cert.pem"), os.path.join(cert_dir, "key.pem")
+    try:
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                        "-keyout", key, "-out", cert], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"note: no certificate ({e}); using plain HTTP")
+        scheme, verify = "http", True
+    else:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme, verify = "https", ssl.create_default_context(cafile=cert)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1", verify
+
+
+def load_chatbot(base_url: str):
+    """Import the chatbot script pointed at the stand-in, with its files in a temp dir."""
+    os.environ["XAI_BASE_URL"] = base_url
+    os.environ.setdefault("XAI_API_KEY", "stand-in")
+    os.environ["GROK_CHATROOM_DIR"] = tempfile.mkdtemp(prefix="grok_verify_")
+    os.environ["GROK_JOURNAL"] = "0"
+    spec = importlib.util.spec_from_file_location("chatbot", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+failures = []
+
+
+def check(name: str, ok: bool, detail: str = "") -> None:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}" + (f" — {detail}" if detail else ""))
+    if not ok:
+        failures.append(name)
+
+
+def stream(bot, handle=None, on_retry=None) -> str:
+    return "".join(bot.generate_response_stream([{"role": "user", "content": "hi"}], "", None,
+                                                handle or bot.RequestHandle(), on_retry))
+
+
+def check_retries(bot) -> None:
+    waits = []
+    StandIn.fail_plan = [(429, {"retry-after": "1"}), (503, {}), (429, {"retry-after-ms": "200"})]
+    StandIn.requests = 0
+    started = time.monotonic()
+    reply = stream(bot, on_retry=lambda attempt, delay, exc: waits.append((exc.status_code, delay)))
+    took = time.monotonic() - started
+    check("succeeds after 429, 503, 429", reply.strip() == StandIn.reply and StandIn.requests == 4,
+          f"{StandIn.requests} requests in {took:.1f}s")
+    check("Retry-After: 1 waits 1s", waits[:1] == [(429, 1.0)],
+          "waits " + ", ".join(f"{status}: {delay:.2f}s" for status, delay in waits))
+    check("retry-after-ms: 200 waits 0.2s", waits[2:] == [(429, 0.2)])
+    cap = bot.RETRY_BASE_DELAY * 2 ** 2
+    check("503 without Retry-After backs off with jitter", len(waits) == 3 and 0 <= waits[1][1] <= cap,
+          f"{waits[1][1]:.2f}s, cap {cap:.1f}s" if len(waits) == 3 else "")
+
+    StandIn.fail_plan = [(429, {"retry-after": "500"})]
+    StandIn.requests = 0
+    started = time.monotonic()
+    try:
+        stream(bot)
+        check("gives up when Retry-After passes the deadline", False, "no error raised")
+    except bot.openai.RateLimitError:
+        took = time.monotonic() - started
+        check("gives up when Retry-After passes the deadline", took < 1.0 and StandIn.requests == 1,
+              f"after {took:.2f}s")
+
+    StandIn.fail_plan = [(400, {})]
+    StandIn.requests = 0
+    try:
+        stream(bot)
+        check("400 is not retried", False, "no error raised")
+    except bot.openai.BadRequestError:
+        check("400 is not retried", StandIn.requests == 1, f"{StandIn.requests} request(s)")
+
+    base_delay, bot.RETRY_BASE_DELAY = bot.RETRY_BASE_DELAY, 0.01  # keep this one quick
+    StandIn.fail_plan = [(500, {})] * (bot.RETRY_MAX_ATTEMPTS + 2)
+    StandIn.requests = 0
+    try:
+        stream(bot)
+        check("stops after RETRY_MAX_ATTEMPTS", False, "no error raised")
+    except bot.openai.InternalServerError:
+        check("stops after RETRY_MAX_ATTEMPTS", StandIn.requests == bot.RETRY_MAX_ATTEMPTS,
+              f"{StandIn.requests} requests")
+    finally:
+        bot.RETRY_BASE_DELAY = base_delay
+        StandIn.fail_plan = []
+
+    handle = bot.RequestHandle()
+    StandIn.fail_plan = [(429, {"retry-after": "30"})]
+    threading.Timer(0.3, handle.cancel).start()
+    started = time.monotonic()
+    try:
+        stream(bot, handle)
+        check("cancel ends a Retry-After wait", False, "no error raised")
+    except bot.RequestCancelled:
+        took = time.monotonic() - started
+        check("cancel ends a Retry-After wait", took < 1.0, f"after {took:.2f}s")
+    except bot.openai.RateLimitError:
+        check("cancel ends a Retry-After wait", False, "raised the 429 instead of RequestCancelled")
+    StandIn.fail_plan = []
+
+
+def check_connection_pool(bot, base_url: str, verify) -> None:
+    pool = bot.XAIClientManager(base_url=base_url, api_key="stand-in", verify=verify)
+    shared_client, bot.client = bot.client, pool.client  # generate_response_stream uses bot.client
+    try:
+        pool.warm_up()
+        deadline = time.monotonic() + 5
+        while pool.stats["warmups"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        check("warm-up opens one connection", pool.stats["new_connections"] == 1, pool.report())
+
+        for _ in range(5):
+            stream(bot)
+        check("sequential requests reuse the warm connection",
+              pool.stats["new_connections"] == 1 and pool.stats["reused_connections"] == 5, pool.report())
+
+        threads = [threading.Thread(target=stream, args=(bot,)) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        check("3 concurrent requests open at most 2 more connections",
+              pool.stats["responses"] == 9 and pool.stats["new_connections"] <= 3, pool.report())
+
+        before = pool.stats["new_connections"]
+        for _ in range(3):
+            stream(bot)
+        check("later requests reuse pooled connections", pool.stats["new_connections"] == before,
+              pool.report())
+
+        StandIn.reply, StandIn.chunk_delay = "word " * 200, 0.02
+        handle = bot.RequestHandle()
+        chunks = bot.generate_response_stream([{"role": "user", "content": "hi"}], "", None, handle)
+        next(chunks)
+        started = time.monotonic()
+        handle.cancel()  # closes the response, as the Stop button does from the UI thread
+        took = time.monotonic() - started
+        try:
+            list(chunks)
+        except Exception:
+            pass  # reading a closed stream raises; _worker ignores that once cancelled
+        check("a stream cancelled mid-reply closes at once", took < 0.5, f"after {took:.2f}s")
+    finally:
+        StandIn.reply, StandIn.chunk_delay = "Hello from the stand-in.", 0.0
+        bot.client = shared_client
+        pool.http_client.close()
+
+
+def main() -> int:
+    server, base_url, verify = start_stand_in()
+    print(f"stand-in at {base_url}")
+    bot = load_chatbot(base_url)
+    # The import-time client trusts only public CAs; this one also trusts the stand-in's certificate
+    bot.client = bot.XAIClientManager(base_url=base_url, api_key="stand-in", verify=verify).client
+    check_retries(bot)
+    check_connection_pool(bot, base_url, verify)
+    server.shutdown()
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# verify_find.py
+"""
+Times chatroomstyle-chatbot-v2.py's find bar (Ctrl+F) over a 10,000-message
+chat: indexing each message as it is rendered, the query run on every
+keystroke, and highlighting the matches on screen.
+
+    python3 verify_find.py
+
+The FindIndex part needs no display: messages are indexed the way
+_index_message indexes them, then a query is typed a character at a time
+and each step from FIND_MIN_CHARS on is timed through what _run_find does
+before touching Tk (find(), then picking out the rendered matches); a
+shorter query, which only runs on Enter, gets a looser limit.  With a display (or Xvfb, see
+verify_render.py) the same messages are inserted into a Tk Text and
+_highlight_visible is timed at the top and bottom of the chat; otherwise
+that part is skipped.  Prints one line per check and exits non-zero if
+any of them fails.
+"""
+
+import gc
+import random
+import statistics
+import sys
+import time
+
+from verify_api_client import check, failures, load_chatbot
+from verify_render import tk_root
+
+MESSAGES = 10000
+ADD_LIMIT = 0.001   # seconds to index one message (99th percentile; a GC pass can land on any one)
+FIND_LIMIT = 0.05   # seconds per keystroke
+ENTER_LIMIT = 0.2   # seconds for a query below FIND_MIN_CHARS, run on Enter
+HIGHLIGHT_LIMIT = 0.02
+TYPED = "connection pool"
+
+
+def messages() -> list:
+    rng = random.Random(0)
+    words = ("the worker thread streams each reply into a queue while the connection pool keeps "
+             "sockets open and the scheduler hands out slots in turn so nothing waits").split()
+    result = []
+    for i in range(MESSAGES):
+        text = ("You: " if i % 2 == 0 else "Grok: ") + " ".join(rng.choices(words, k=50)) + "\n"
+        if i == 7777:
+            text = text.replace("\n", " zephyr\n")  # one message with a rare word
+        result.append(text)
+    return result
+
+
+def build_index(bot, texts: list) -> tuple:
+    index = bot.FindIndex()
+    took = []
+    for i, text in enumerate(texts):
+        ex = {"seq": i // 2, "mark": f"exchange_{i // 2}"}
+        started = time.perf_counter()
+        index.add(index.next_mark(), text, bot.GrokChatBot._find_key(ex), ex["mark"], ex)
+        took.append(time.perf_counter() - started)
+    return index, took
+
+
+def run_query(index, query: str) -> tuple:
+    """What _run_find does per keystroke before touching Tk; (seconds, hits, shown)."""
+    started = time.perf_counter()
+    hits = index.find(query)
+    shown = [pos for pos, (entry_id, _offset) in enumerate(hits)
+             if index.entries[entry_id]["mark"] is not None]
+    return time.perf_counter() - started, hits, shown
+
+
+def check_highlight(bot, index, texts: list) -> None:
+    root, display = tk_root()
+    if root is None:
+        print(f"skip highlighting the visible matches in a Tk Text — {display}")
+        return
+
+    class FindWindow:
+        _find_length = bot.GrokChatBot._find_length
+        _shown_index = bot.GrokChatBot._shown_index
+        _first_shown_from = bot.GrokChatBot._first_shown_from
+        _highlight_visible = bot.GrokChatBot._highlight_visible
+
+    try:
+        widget = bot.scrolledtext.ScrolledText(root, wrap="word", width=100, height=40)
+        widget.pack()
+        for mark, text in zip(index.marks(), texts):
+            widget.mark_set(mark, "end-1c")
+            widget.mark_gravity(mark, "left")
+            widget.insert("end", text)
+        window = FindWindow()
+        window.chat_display, window.find_index = widget, index
+        window._find_open, window._find_query = False, TYPED
+        _took, window._find_hits, window._find_shown = run_query(index, TYPED)
+        for where in ("1.0", "end"):
+            widget.see(where)
+            root.update()
+            started = time.perf_counter()
+            window._highlight_visible()
+            took = time.perf_counter() - started
+            tagged = len(widget.tag_ranges("find_match")) // 2
+            check(f"highlight on screen only, at {where}", took < HIGHLIGHT_LIMIT and 0 < tagged < 500,
+                  f"{took * 1000:.2f} ms, {tagged} tagged of {len(window._find_shown):,}")
+    finally:
+        root.destroy()
+        if display is not None:
+            display.stop()
+
+
+def main() -> int:
+    bot = load_chatbot("http://127.0.0.1:9/v1")  # nothing is requested
+    texts = messages()
+    index, took = build_index(bot, texts)
+    took.sort()
+    p99 = took[len(took) * 99 // 100]
+    check(f"indexing a message under {ADD_LIMIT * 1000:.0f} ms", p99 < ADD_LIMIT,
+          f"median {statistics.median(took) * 1e6:.0f} µs, 99th percentile {p99 * 1e6:.0f} µs, "
+          f"worst {took[-1] * 1e6:.0f} µs")
+    gc.collect()  # in a long session the index has long since been through a full collection
+
+    for n in range(1, bot.FIND_MIN_CHARS):
+        seconds, hits, _shown = run_query(index, TYPED[:n])
+        check(f"{TYPED[:n]!r} on Enter under {ENTER_LIMIT * 1000:.0f} ms", seconds < ENTER_LIMIT,
+              f"{seconds * 1000:.1f} ms, {len(hits):,} matches")
+    for n in range(bot.FIND_MIN_CHARS, len(TYPED) + 1):
+        seconds, hits, _shown = run_query(index, TYPED[:n])
+        check(f"keystroke {n} of {TYPED!r} under {FIND_LIMIT * 1000:.0f} ms", seconds < FIND_LIMIT,
+              f"{seconds * 1000:.1f} ms, {len(hits):,} matches")
+    seconds, hits, shown = run_query(index, "ZEPHYR")
+    check("a rare word is found case-insensitively, at its message's mark",
+          len(shown) == 1 and index.index_of(*hits[shown[0]]).startswith("find_7777 + "),
+          f"{seconds * 1000:.2f} ms")
+    check_highlight(bot, index, texts)
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# verify_render.py
+"""
+Times how chatroomstyle-chatbot-v2.py renders a reply holding a 5,000-line
+[code] block, the case that used to freeze the UI in Long mode.
+
+    python3 verify_render.py
+
+build_render_ops (the worker-thread parse) is timed without a display.
+apply_render_ops is first run against a widget that only counts calls, to
+check the block goes in as one tagged range rather than a few Tcl calls
+per line, and then timed into a real Tk Text.  That last part needs a
+display; without one it starts a virtual one with xvfbwrapper if that and
+Xvfb are installed, and otherwise reports it as skipped.  Prints one line
+per check and exits non-zero if any of them fails.
+"""
+
+import sys
+import time
+
+from verify_api_client import check, failures, load_chatbot
+
+CODE_LINES = 5000
+BUILD_LIMIT = 0.5  # seconds; the parse runs off the UI thread but still delays the reply
+APPLY_LIMIT = 0.5  # seconds the UI thread may spend inserting the reply
+
+
+def code_reply(lines: int = CODE_LINES) -> str:
+    body = "\n".join(f"    result_{i} = compute(value_{i}, *args)  # line {i}" for i in range(lines))
+    return f"Here is the module.\n\n[code]\n{body}\n[/code]\n\nThat is all of it."
+
+
+class CountingText:
+    """Stands in for a Text widget; counts the calls apply_render_ops makes."""
+
+    def __init__(self):
+        self.calls = {}
+        self.chars = 0
+
+    def config(self, **options):
+        self.calls["config"] = self.calls.get("config", 0) + 1
+
+    def insert(self, index, *runs):
+        self.calls["insert"] = self.calls.get("insert", 0) + 1
+        self.chars += sum(len(chars) for chars in runs[::2])
+
+
+def tk_root():
+    """A Tk root on the current display or a virtual one; (root, display) or (None, reason)."""
+    import tkinter as tk
+    try:
+        return tk.Tk(), None
+    except tk.TclError as e:
+        reason = str(e)
+    try:
+        from xvfbwrapper import Xvfb
+        display = Xvfb(width=1280, height=1024)
+        display.start()
+    except Exception as e:  # no xvfbwrapper, or no Xvfb binary
+        return None, f"{reason}; no virtual display ({e})"
+    try:
+        return tk.Tk(), display
+    except tk.TclError as e:
+        display.stop()
+        return None, f"{reason}; Tk failed on Xvfb too ({e})"
+
+
+def check_build(bot, text: str) -> list:
+    started = time.perf_counter()
+    ops = bot.build_render_ops("Grok", text)
+    took = time.perf_counter() - started
+    code_runs = [op for op in ops if op[0] == "text" and "code" in op[2]]
+    check(f"{CODE_LINES:,}-line block parses to one code run", len(code_runs) == 1
+          and code_runs[0][1].count("\n") == CODE_LINES, f"{len(ops)} ops, {len(code_runs)} code run(s)")
+    check(f"build_render_ops under {BUILD_LIMIT}s", took < BUILD_LIMIT, f"{took * 1000:.1f} ms")
+    return ops
+
+
+def check_apply_calls(bot, ops: list) -> None:
+    widget = CountingText()
+    bot.apply_render_ops(widget, ops)
+    calls = sum(widget.calls.values())
+    check("applies in a constant number of widget calls", calls <= 4,
+          ", ".join(f"{n} {name}" for name, n in sorted(widget.calls.items())) + f", {widget.chars:,} chars")
+
+
+def check_apply_tk(bot, ops: list) -> None:
+    root, display = tk_root()
+    if root is None:
+        print(f"skip apply_render_ops into a Tk Text — {display}")
+        return
+    try:
+        widget = bot.scrolledtext.ScrolledText(root, wrap="word", width=100, height=40)
+        widget.tag_configure("code", font=("Courier", 11), background="#f4f4f4")
+        widget.pack()
+        root.update()
+        started = time.perf_counter()
+        bot.apply_render_ops(widget, ops)
+        took = time.perf_counter() - started
+        root.update()  # layout and first paint
+        painted = time.perf_counter() - started
+        ranges = widget.tag_ranges("code")
+        check("code tag covers the block as one range", len(ranges) == 2,
+              f"{len(ranges) // 2} range(s)")
+        check(f"apply_render_ops under {APPLY_LIMIT}s", took < APPLY_LIMIT,
+              f"{took * 1000:.1f} ms, {painted * 1000:.1f} ms with the first paint")
+    finally:
+        root.destroy()
+        if display is not None:
+            display.stop()
+
+
+def main() -> int:
+    bot = load_chatbot("http://127.0.0.1:9/v1")  # nothing is requested
+    ops = check_build(bot, code_reply())
+    check_apply_calls(bot, ops)
+    check_apply_tk(bot, ops)
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
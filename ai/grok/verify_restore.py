@@ -0,0 +1,106 @@
+# verify_restore.py
+"""
+Times restoring a 500-exchange session from chatroomstyle-chatbot-v2.py's
+crash journal, which should take well under a second.
+
+    python3 verify_restore.py
+
+A journal of 500 exchanges (1,000 turns, some with Long answers, one
+exchange deleted) is written with SessionJournal, then restored the way
+SessionManager does at startup: leftovers(), load(), and render ops for
+the last RESTORE_RENDER_EXCHANGES exchanges only; the rest stay collapsed
+until scrolled to.  Inserting those ops into a Tk Text is timed too when a
+display is available (see verify_render.py), and skipped otherwise.
+Prints one line per check and exits non-zero if any of them fails.
+"""
+
+import sys
+import time
+
+from verify_api_client import check, failures, load_chatbot
+from verify_render import tk_root
+
+EXCHANGES = 500
+RESTORE_LIMIT = 0.25  # seconds, journal to render ops
+
+
+def write_journal(bot, session_id: str) -> None:
+    journal = bot.session_journal
+    for i in range(EXCHANGES):
+        question = f"Question {i}: how should the scheduler treat request {i} when the pool is full?"
+        reply = f"Answer {i}. " + "It waits for a free slot, in order, and the UI shows its place. " * 12
+        journal.append(session_id, {"t": "turn", "seq": 2 * i, "role": "user", "content": question,
+                                    "exchange": "Ask Questions"})
+        journal.append(session_id, {"t": "turn", "seq": 2 * i + 1, "role": "assistant", "content": reply})
+        if i % 10 == 0:
+            journal.append(session_id, {"t": "long", "seq": 2 * i + 1, "text": reply * 3})
+    journal.append(session_id, {"t": "delete", "seq": 20, "count": 2})  # exchange 10
+    journal.flush()
+
+
+def restore(bot, session_id: str):
+    """What startup does before anything is inserted: (conversation, exchanges, ops per visible exchange)."""
+    class RestoredWindow:
+        _format_user_message = staticmethod(bot.GrokChatBot._format_user_message)
+        _exchange_reply = bot.GrokChatBot._exchange_reply
+        _exchange_ops = bot.GrokChatBot._exchange_ops
+
+    assert session_id in bot.session_journal.leftovers()
+    conversation, exchanges = bot.session_journal.load(session_id)
+    window = RestoredWindow()
+    window.conversation = conversation
+    window.exchanges = bot.ExchangeIndex()
+    for i, (conv, mode_display) in enumerate(exchanges):
+        stop = exchanges[i + 1][0] if i + 1 < len(exchanges) else len(conversation)
+        window.exchanges.append(i, conv, mode_display, stop)
+    shown = window.exchanges[-bot.RESTORE_RENDER_EXCHANGES:]
+    return conversation, exchanges, [window._exchange_ops(ex) for ex in shown]
+
+
+def check_insert(bot, rendered: list) -> None:
+    root, display = tk_root()
+    if root is None:
+        print(f"skip inserting the restored exchanges into a Tk Text — {display}")
+        return
+    try:
+        widget = bot.scrolledtext.ScrolledText(root, wrap="word", width=100, height=40)
+        widget.pack()
+        root.update()
+        started = time.perf_counter()
+        for ops_list in rendered:
+            for ops in ops_list:
+                bot.apply_render_ops(widget, ops, forms=False)
+        root.update()
+        took = time.perf_counter() - started
+        check("restored exchanges insert and paint quickly", took < RESTORE_LIMIT, f"{took * 1000:.1f} ms")
+    finally:
+        root.destroy()
+        if display is not None:
+            display.stop()
+
+
+def main() -> int:
+    bot = load_chatbot("http://127.0.0.1:9/v1")  # nothing is requested
+    bot.session_journal = bot.SessionJournal()  # load_chatbot turns the journal off
+    session_id = "verify_restore"
+    write_journal(bot, session_id)
+
+    started = time.perf_counter()
+    conversation, exchanges, rendered = restore(bot, session_id)
+    took = time.perf_counter() - started
+    check(f"journal replays {EXCHANGES} exchanges less the deleted one",
+          len(conversation) == 2 * (EXCHANGES - 1) and len(exchanges) == EXCHANGES - 1
+          and exchanges[10] == (20, "Ask Questions") and conversation[20]["content"].startswith("Question 11:"),
+          f"{len(conversation)} turns, {len(exchanges)} exchanges")
+    check(f"only the last {bot.RESTORE_RENDER_EXCHANGES} exchanges are rendered",
+          len(rendered) == bot.RESTORE_RENDER_EXCHANGES)
+    check(f"restore under {RESTORE_LIMIT}s before inserting", took < RESTORE_LIMIT, f"{took * 1000:.1f} ms")
+    check_insert(bot, rendered)
+    bot.session_journal.discard(session_id)
+    bot.session_journal.flush()
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
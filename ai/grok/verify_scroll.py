@@ -0,0 +1,129 @@
+# verify_scroll.py
+"""
+Checks that chatroomstyle-chatbot-v2.py's per-reply scroll stays flat as a
+session grows, and that it still puts the `You:` line at the top when
+lines wrap.
+
+    python3 verify_scroll.py
+
+A chat Text is filled with 10 and then 1,000 messages (all rendered, which
+is more than the app keeps once older exchanges collapse into the
+scrollback), and a new exchange is added the way the app adds one:
+_begin_exchange, the `You:` line, the reply, then _scroll_to_last_user.
+The reply and the scroll are timed at both sizes, next to the display-line
+count the scroll used before, which walks the whole transcript.
+
+Needs Tk and a display; without one it starts a virtual one with
+xvfbwrapper if that and Xvfb are installed (see verify_render.py), and
+otherwise reports every check as skipped.  Exits non-zero if any fails.
+"""
+
+import statistics
+import sys
+import time
+
+from verify_api_client import check, failures, load_chatbot
+from verify_render import tk_root
+
+SIZES = (10, 1000)  # messages in the transcript; two per exchange
+REPEATS = 15
+QUESTION = ("How do I keep a long-running Tk app responsive while a worker thread streams a reply "
+            "that can run to thousands of lines, without the window freezing at any point? ") * 2
+REPLY = "\n\n".join(["The UI thread should only insert text that is ready to show; parsing, "
+                     "network reads and retries all belong on the worker, which hands results "
+                     "back through a queue the Tk loop drains when woken."] * 8)
+
+
+class ChatWindow:
+    """Just the parts of GrokChatBot that adding an exchange and scrolling use."""
+
+    def __init__(self, bot, widget):
+        self.bot = bot
+        self.chat_display = widget
+        self.conversation = []
+        self.exchanges = bot.ExchangeIndex()
+        self._exchange_seq = 0
+        self.last_user_start = None
+
+    def add_exchange(self) -> float:
+        """Add a question and its reply; returns the seconds the reply took to go in."""
+        bot, widget = self.bot, self.chat_display
+        self.last_user_start = bot.GrokChatBot._begin_exchange(self, "QA")
+        question = bot.GrokChatBot._format_user_message(QUESTION, "QA")
+        bot.apply_render_ops(widget, bot.build_render_ops("You", question), self)
+        ops = bot.build_render_ops("Grok", REPLY)  # the worker's part
+        started = time.perf_counter()
+        bot.apply_render_ops(widget, ops, self)
+        took = time.perf_counter() - started
+        self.conversation += [{"role": "user", "content": QUESTION}, {"role": "assistant", "content": REPLY}]
+        return took
+
+    def scroll(self) -> float:
+        started = time.perf_counter()
+        self.bot.GrokChatBot._scroll_to_last_user(self)
+        self.chat_display.update_idletasks()
+        return time.perf_counter() - started
+
+    def count_scroll(self) -> float:
+        """The scroll _scroll_to_last_user did before: display-line counts from 1.0."""
+        widget = self.chat_display
+        started = time.perf_counter()
+        above = int(widget.tk.call(widget._w, "count", "-displaylines", "1.0", self.last_user_start))
+        total = int(widget.tk.call(widget._w, "count", "-displaylines", "1.0", "end-1c"))
+        widget.yview_moveto(max(0.0, min(1.0, (above - 1) / max(total, 1))))
+        widget.update_idletasks()
+        return time.perf_counter() - started
+
+
+def measure(bot, root, messages: int) -> dict:
+    widget = bot.scrolledtext.ScrolledText(root, wrap="word", width=60, height=20)
+    widget.pack()
+    window = ChatWindow(bot, widget)
+    for _ in range(messages // 2 - 1):
+        window.add_exchange()
+    widget.see("end")
+    root.update()
+    reply, scroll, counted, on_top = [], [], [], 0
+    for _ in range(REPEATS):
+        reply.append(window.add_exchange())
+        widget.see("end")
+        widget.update_idletasks()
+        scroll.append(window.scroll())
+        on_top += widget.index("@0,0") == widget.index(window.last_user_start)
+        widget.see("end")
+        widget.update_idletasks()
+        counted.append(window.count_scroll())
+    widget.destroy()
+    return {"reply": statistics.median(reply), "scroll": statistics.median(scroll),
+            "counted": statistics.median(counted), "on_top": on_top}
+
+
+def main() -> int:
+    bot = load_chatbot("http://127.0.0.1:9/v1")  # nothing is requested
+    root, display = tk_root()
+    if root is None:
+        print(f"skip all scroll checks — {display}")
+        return 0
+    try:
+        results = {n: measure(bot, root, n) for n in SIZES}
+    finally:
+        root.destroy()
+        if display is not None:
+            display.stop()
+    small, large = (results[n] for n in SIZES)
+    for n, r in results.items():
+        check(f"`You:` line at the top after the scroll ({n:,} messages, wrapped lines)",
+              r["on_top"] == REPEATS, f"{r['on_top']} of {REPEATS}")
+    for key, label in (("scroll", "scroll"), ("reply", "reply insert")):
+        # Flat: within 3x (or 2 ms) of the small transcript, where the old count grows with it
+        check(f"{label} cost flat from {SIZES[0]} to {SIZES[1]:,} messages",
+              large[key] <= max(3 * small[key], small[key] + 0.002),
+              f"{small[key] * 1000:.2f} ms -> {large[key] * 1000:.2f} ms")
+    print(f"     display-line count used before: {small['counted'] * 1000:.2f} ms -> "
+          f"{large['counted'] * 1000:.2f} ms")
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
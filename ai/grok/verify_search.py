@@ -0,0 +1,98 @@
+# verify_search.py
+"""
+Times chatroomstyle-chatbot-v2.py's full-text search (SessionStore.search)
+over 100,000 stored messages; queries should come back in milliseconds.
+
+    python3 verify_search.py
+
+Fills a SessionStore in a temp dir through append_turn (the app's write
+path) with 1,000 sessions of 100 messages drawn from a skewed vocabulary,
+so some words are in most messages and some in a handful, and imports two
+chat_session_*.txt exports.  Then times rare, common, multi-word and
+prefix queries, and checks that hits are ranked and highlighted and that
+the imported exports are found.  Filling the store takes about half a
+minute; no display is needed.  Prints one line per check and exits
+non-zero if any of them fails.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from verify_api_client import check, failures, load_chatbot
+
+SESSIONS, TURNS = 1000, 100
+SEARCH_LIMIT = 0.05  # seconds per query
+QUERIES = ["zephyr", "word300", "scheduler", "connection pool", "retry after", "hedg"]
+
+
+def fill(store) -> float:
+    rng = random.Random(0)
+    words = ["scheduler", "connection", "pool", "retry", "after", "hedge", "hedged", "breaker",
+             "journal", "render"] + [f"word{i}" for i in range(5000)]
+    weights = [1 / (rank + 1) for rank in range(len(words))]  # Zipf-like: a few words everywhere
+    started = time.perf_counter()
+    for s in range(SESSIONS):
+        session_id = f"verify_{s:04d}"
+        for seq in range(TURNS):
+            content = " ".join(rng.choices(words, weights, k=40))
+            if s == 777 and seq == 42:
+                content += " zephyr"  # one message with a rare word
+            store.append_turn(session_id, seq, "user" if seq % 2 == 0 else "assistant", content,
+                              {"label": "Ask Questions"} if seq % 2 == 0 else {})
+    store.flush(timeout=None)
+    return time.perf_counter() - started
+
+
+def import_exports(store, directory: str) -> int:
+    imported = 0
+    for i in range(2):
+        path = os.path.join(directory, f"chat_session_2024010{i}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Grok: Hello! How can I help?\n\n"
+                    f"You: where did the quokka export {i} go\n\n"
+                    "Grok: It was saved next to the others.\n\n")
+        imported += store.import_export(path)
+    store.flush()
+    return imported
+
+
+def time_query(store, query: str) -> tuple:
+    store.search(query)  # first run pays for opening the reader and warming the page cache
+    runs = []
+    for _ in range(5):
+        started = time.perf_counter()
+        hits = store.search(query)
+        runs.append(time.perf_counter() - started)
+    return statistics.median(runs), hits
+
+
+def main() -> int:
+    bot = load_chatbot("http://127.0.0.1:9/v1")  # nothing is requested
+    directory = tempfile.mkdtemp(prefix="grok_verify_search_")
+    store = bot.SessionStore(os.path.join(directory, "sessions.sqlite3"))
+    took = fill(store)
+    print(f"     stored {SESSIONS * TURNS:,} messages in {took:.1f}s ({store.report()})")
+
+    for query in QUERIES:
+        took, hits = time_query(store, query)
+        check(f"search {query!r} under {SEARCH_LIMIT * 1000:.0f} ms", took < SEARCH_LIMIT and bool(hits),
+              f"{took * 1000:.2f} ms, {len(hits)} hit(s)")
+    _took, hits = time_query(store, "zephyr")
+    check("a rare word finds its one message, highlighted",
+          [(h["session_id"], h["seq"]) for h in hits] == [("verify_0777", 42)]
+          and f"{bot.SEARCH_MARK_START}zephyr{bot.SEARCH_MARK_END}" in hits[0]["snippet"])
+
+    check("exports import as sessions", import_exports(store, directory) == 4)
+    _took, hits = time_query(store, "quokka")
+    check("imported exports are found", len(hits) == 2 and all(h["session_id"].startswith("import:")
+                                                               for h in hits), f"{len(hits)} hit(s)")
+    print(f"{len(failures)} check(s) failed" if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())